@@ -0,0 +1,53 @@
+"""
+DART Configuration Loader
+-------------------------
+Parses config.json once per process and shares a read-only view of it between
+all scripts that are run in-process (prepare_simulation, run_dart_sequence,
+preprocess_soils, ...).
+"""
+
+import os
+from functools import lru_cache
+from types import MappingProxyType
+
+try:
+    # C JSON parser; orjson.JSONDecodeError subclasses json.JSONDecodeError
+    import orjson as json_parser
+except ImportError:
+    import json as json_parser
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG_PATH = os.path.join(SCRIPT_DIR, "config.json")
+
+def get_config(config_path=None):
+    """
+    Return the parsed configuration, re-reading config.json only when it has been modified.
+
+    Args:
+        config_path (str): Path to config.json. Defaults to config.json next to the scripts.
+
+    Returns:
+        Mapping: A read-only view of the configuration, shared between callers
+            (objects are mappingproxy, arrays are tuples).
+    """
+    return _load_config(*_config_key(config_path))
+
+def _config_key(config_path):
+    """Cache key for config_path: its absolute path and modification time"""
+    if config_path is None:
+        config_path = DEFAULT_CONFIG_PATH
+    config_path = os.path.abspath(config_path)
+    return config_path, os.stat(config_path).st_mtime_ns
+
+@lru_cache(maxsize=4)
+def _load_config(config_path, mtime_ns):
+    with open(config_path, 'rb') as f:
+        return _freeze(json_parser.loads(f.read()))
+
+def _freeze(value):
+    """Read-only copy of a parsed JSON value"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
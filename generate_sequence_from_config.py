@@ -1,18 +1,80 @@
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
-import json
+from xml.sax.saxutils import quoteattr
 import random as rd
+import numpy as np
 import os
 import sys
 from preprocess_soils import check_soil_factor_path, get_spectral_intervals
+from config_loader import get_config
 
-def get_available_soils(config_path):
-    """Get list of available soil names based on configuration"""
+# Sequencer propertyName templates, shared by every tree entry
+SCALE_PROPERTY = "object_3d.ObjectList.Object[%d].GeometricProperties.ScaleProperties.%sscale"
+THERMAL_MEAN_T = "Coeff_diff.Temperatures.ThermalFunction[%d].meanT"
+PROSPECT_PREFIX = "Coeff_diff.Surfaces.LambertianMultiFunctions.LambertianMulti["
+PROSPECT_SUFFIX = "].Lambertian.ProspectExternalModule.ProspectExternParameters."
+
+# Fixed DartSequencerPreferences / DartLutPreferences attributes
+SEQUENCER_PREFERENCES = {
+    "atmosphereMaketLaunched": "true",
+    "dartLaunched": "true",
+    "deleteAll": "false",
+    "deleteAtmosphere": "false",
+    "deleteAtmosphereMaket": "false",
+    "deleteBandFolder": "false",
+    "deleteDartLut": "false",
+    "deleteDartSequenceur": "false",
+    "deleteDartTxt": "false",
+    "deleteDirection": "false",
+    "deleteInputs": "false",
+    "deleteLibPhase": "false",
+    "deleteMaket": "false",
+    "deleteMaketTreeResults": "false",
+    "deletePlyFolder": "false",
+    "deleteScnFiles": "false",
+    "deleteTreePosition": "false",
+    "deleteTriangles": "false",
+    "demGeneratorLaunched": "false",
+    "directionLaunched": "false",
+    "displayEnabled": "true",
+    "hapkeLaunched": "false",
+    "individualDisplayEnabled": "false",
+    "maketLaunched": "true",
+    "numberOfEnumerateValuesDisplayed": "1000",
+    "numberParallelThreads": "4",
+    "phaseLaunched": "true",
+    "prospectLaunched": "true",
+    "triangleFileProcessorLaunched": "true",
+    "useBroadBand": "true",
+    "useSceneSpectra": "true",
+    "vegetationLaunched": "true",
+    "zippedResults": "false"
+}
+
+LUT_PREFERENCES = {
+    "addedDirection": "false",
+    "atmosToa": "false",
+    "atmosToaOrdre": "false",
+    "coupl": "true",
+    "fluorescence": "true",
+    "generateLUT": "false",
+    "iterx": "true",
+    "luminance": "true",
+    "maketCoverage": "false",
+    "ordre": "true",
+    "otherIter": "true",
+    "phiMax": "",
+    "phiMin": "",
+    "productsPerType": "false",
+    "reflectance": "true",
+    "sensor": "true",
+    "storeIndirect": "false",
+    "thetaMax": "",
+    "thetaMin": "",
+    "toa": "true"
+}
+
+def get_available_soils(config):
+    """Get list of available soil names based on an already-loaded configuration dict"""
     try:
-        # Read configuration
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
         # If multi_sol is not enabled, return None
         if not config['simulation_settings']['multi_sol']:
             return None
@@ -40,8 +102,8 @@ def get_available_soils(config_path):
             valid_soils = check_soil_band_files(soil_factor_path, spectral_info)
         except (ImportError, AttributeError):
             # Fallback if import fails: just use directory names
-            valid_soils = [f for f in os.listdir(soil_factor_path) 
-                         if os.path.isdir(os.path.join(soil_factor_path, f))]
+            with os.scandir(soil_factor_path) as it:
+                valid_soils = [entry.name for entry in it if entry.is_dir(follow_symlinks=False)]
             print("Warning: Using directory names as soil identifiers without validation")
         
         if not valid_soils:
@@ -54,76 +116,102 @@ def get_available_soils(config_path):
         print(f"Error getting available soils: {str(e)}")
         return None
 
-def read_scale_from_positions(position_file_path):
-    """Read scale values from positions.txt file."""
+def read_positions(position_file_path, read_scales=True):
+    """Count trees in positions.txt and, if requested, read their xscale values in the same pass."""
+    count = 0
     scales = []
     try:
-        with open(position_file_path, 'r') as f:
+        # Bytes mode skips text decoding; float() accepts bytes directly
+        with open(position_file_path, 'rb') as f:
             for line in f:
-                if line.strip().startswith('0'):  # Tree position line
-                    values = line.strip().split()
-                    if len(values) >= 7:  # Ensure we have scale values
-                        scales.append(float(values[4]))  # xscale value
+                if line.lstrip()[:1] == b'0':  # Tree position line
+                    count += 1
+                    if read_scales:
+                        values = line.split()
+                        if len(values) >= 7:  # Ensure we have scale values
+                            scales.append(float(values[4]))  # xscale value
     except Exception as e:
         print(f"Error reading position file: {e}")
-    return scales
+        return 0, []
+    return count, scales
 
-def count_trees_in_position_file(position_file_path):
-    """Count number of trees in position file."""
-    try:
-        with open(position_file_path, 'r') as f:
-            lines = f.readlines()
-            tree_count = sum(1 for line in lines if line.strip().startswith('0'))
-        return tree_count
-    except Exception as e:
-        print(f"Error reading position file: {e}")
-        return 0
+def join_rows(rows):
+    """Join each row of values into a ';'-separated sequencer args string."""
+    return [";".join(map(str, row)) for row in rows]
 
 def generate_random_values(nbr_simulation, num_trees):
     """Generate random values for parameters."""
+    rng = np.random.default_rng()
+    
     # Generate Cab values (chlorophyll content) - different for each tree
-    cab_values = []
-    for _ in range(num_trees):
-        cab_values.append([str(rd.random() * 70 + 20) for _ in range(nbr_simulation)])
+    cab = rng.random((num_trees, nbr_simulation)) * 70 + 20
     
     # Generate Cw values (water content) - different for each tree
-    cw_values = []
-    for _ in range(num_trees):
-        cw_values.append([str(rd.random() * 0.04 + 0.01) for _ in range(nbr_simulation)])
+    cw = rng.random((num_trees, nbr_simulation)) * 0.04 + 0.01
     
-    # Generate temperature values
-    temp_values = []
-    for _ in range(nbr_simulation):
-        # Base soil temperature between 290K-310K
-        soil = rd.uniform(290, 310)
-        temps = [soil]  # Soil temperature
-        
-        # Leaf temperatures (cooler than soil)
-        for _ in range(num_trees):
-            leaf_temp = soil - rd.uniform(1, 10)
-            temps.append(leaf_temp)
-        
-        # Trunk temperatures (between soil and leaf)
-        for _ in range(num_trees):
-            trunk_temp = soil - rd.uniform(0.5, 5)
-            temps.append(trunk_temp)
-        
-        temp_values.append([str(t) for t in temps])
+    # Generate temperature values, one row per simulation:
+    # column 0 is soil, 1..N leaves, N+1..2N trunks
+    temps = np.empty((nbr_simulation, 1 + 2 * num_trees), dtype=np.float64)
+    # Base soil temperature between 290K-310K
+    soil = rng.uniform(290, 310, nbr_simulation)
+    temps[:, 0] = soil
+    # Leaf temperatures (cooler than soil)
+    temps[:, 1:1 + num_trees] = soil[:, None] - rng.uniform(1, 10, (nbr_simulation, num_trees))
+    # Trunk temperatures (between soil and leaf)
+    temps[:, 1 + num_trees:] = soil[:, None] - rng.uniform(0.5, 5, (nbr_simulation, num_trees))
+    
+    # Values stay numeric; they are converted to text only where entries are emitted
+    return cab, cw, temps
+
+class IndentedXMLWriter:
+    """Write XML elements straight to a file as formatted lines with four-space indentation."""
+    
+    def __init__(self, out, indent="    "):
+        self.out = out
+        # Bound once: entry() is called once per tree and parameter
+        self.write = out.write
+        self.indent = indent
+        self.depth = 0
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    
+    @staticmethod
+    def _attributes(attrs):
+        if not attrs:
+            return ""
+        return "".join(f" {key}={quoteattr(value)}" for key, value in attrs.items())
     
-    return cab_values, cw_values, temp_values
+    def start(self, name, attrs=None):
+        """Open an element that will contain children."""
+        self.out.write(f"{self.indent * self.depth}<{name}{self._attributes(attrs)}>\n")
+        self.depth += 1
+    
+    def end(self, name):
+        """Close the most recently opened element."""
+        self.depth -= 1
+        self.out.write(f"{self.indent * self.depth}</{name}>\n")
+    
+    def element(self, name, attrs=None):
+        """Write an empty element on its own line."""
+        self.out.write(f"{self.indent * self.depth}<{name}{self._attributes(attrs)}/>\n")
+    
+    def entry(self, args, property_name, entry_type="enumerate", quote=quoteattr):
+        """Write a DartSequencerDescriptorEntry; args is the ';'-joined value string."""
+        self.write(
+            f"{self.indent * self.depth}<DartSequencerDescriptorEntry args={quote(args)} "
+            f"propertyName={quote(property_name)} type={quote(entry_type)}/>\n"
+        )
 
 def create_sequence_xml(config_path):
-    # Read configuration
-    with open(config_path, 'r') as f:
-        config = json.load(f)
+    # Read configuration (parsed once per process and shared with get_available_soils)
+    config = get_config(config_path)
     
     # Get parameters
     nbr_simulation = config['nbr_of_sequence']
     position_file = config['paths']['position_txt_path']
     params_to_vary = config['parameters_to_vary']
     
-    # Count trees
-    num_trees = count_trees_in_position_file(position_file)
+    # Count trees and read scales (if needed) in a single pass over the positions file
+    num_trees, scales = read_positions(position_file, params_to_vary['scale'])
     if num_trees == 0:
         print("No trees found in position file!")
         return
@@ -133,213 +221,129 @@ def create_sequence_xml(config_path):
     # Generate random values
     cab_values, cw_values, temp_values = generate_random_values(nbr_simulation, num_trees)
     
-    # Read scales from positions file if needed
-    scales = read_scale_from_positions(position_file) if params_to_vary['scale'] else []
+    # Transpose and format temperatures once: column 0 is soil, 1..N leaves, N+1..2N trunks
+    # (astype(str) gives the same full-precision text as str(float))
+    temp_columns = temp_values.T.astype(str).tolist()
+    
+    # Look up available soils once; they set both the LambertianMulti offset and the soil group
+    soils = get_available_soils(config) if config['simulation_settings']['multi_sol'] else None
     
     # Determine starting index offset for LambertianMulti elements
     offset = 0
-    if config['simulation_settings']['multi_sol']:
-        soils = get_available_soils(config_path)
-        if soils and len(soils) > 0:
-            offset = len(soils)
-            print(f"Multi-soil enabled with {offset} soils - tree LambertianMulti indices will start from {offset}")
-    
-    # Create root element
-    root = ET.Element("DartFile")
-    root.set("version", "1.0")
-    
-    # Create DartSequencerDescriptor
-    descriptor = ET.SubElement(root, "DartSequencerDescriptor")
-    descriptor.set("sequenceName", "sequence;;sequence")
-    
-    # Create entries section
-    entries = ET.SubElement(descriptor, "DartSequencerDescriptorEntries")
-    
-    # Create primary group for parameters
-    group = ET.SubElement(entries, "DartSequencerDescriptorGroup")
-    group.set("currentDisplayedPage", "1")
-    group.set("groupName", "group1")
+    if soils:
+        offset = len(soils)
+        print(f"Multi-soil enabled with {offset} soils - tree LambertianMulti indices will start from {offset}")
     
-    # Add entries based on parameters_to_vary
-    
-    # Scale entries
-    if params_to_vary['scale'] and scales:
-        for i in range(num_trees):
-            # Generate scale deviation for this object
-            scale_deviation = [str(scales[i] * (0.8 + 0.4 * rd.random())) for _ in range(nbr_simulation)]
-            
-            # Add scale entries
-            for axis in ['x', 'y', 'z']:
-                scale_entry = ET.SubElement(group, "DartSequencerDescriptorEntry")
-                scale_entry.set("args", ";".join(scale_deviation))
-                scale_entry.set("propertyName", f"object_3d.ObjectList.Object[{i}].GeometricProperties.ScaleProperties.{axis}scale")
-                scale_entry.set("type", "enumerate")
-    
-    # Temperature entries
-    if params_to_vary['tree_temperature'] or params_to_vary['soil_temperature']:
-        # Soil temperature (if enabled)
-        if params_to_vary['soil_temperature']:
-            soil_temp_entry = ET.SubElement(group, "DartSequencerDescriptorEntry")
-            soil_temp_args = [temp_list[0] for temp_list in temp_values]
-            soil_temp_entry.set("args", ";".join(soil_temp_args))
-            soil_temp_entry.set("propertyName", "Coeff_diff.Temperatures.ThermalFunction[0].meanT")
-            soil_temp_entry.set("type", "enumerate")
+    output_path = os.path.join(config['paths']['simulation_path'], "sequence.xml")
+    with open(output_path, "w", encoding="utf-8") as out:
+        xml = IndentedXMLWriter(out)
         
-        # Tree temperatures (if enabled)
-        if params_to_vary['tree_temperature']:
-            # Leaf temperatures
-            for i in range(num_trees):
-                leaf_temp_entry = ET.SubElement(group, "DartSequencerDescriptorEntry")
-                leaf_temp_args = [temp_list[i + 1] for temp_list in temp_values]
-                leaf_temp_entry.set("args", ";".join(leaf_temp_args))
-                leaf_temp_entry.set("propertyName", f"Coeff_diff.Temperatures.ThermalFunction[{1 + 2 * i}].meanT")
-                leaf_temp_entry.set("type", "enumerate")
-            
-            # Trunk temperatures
+        # Create root element
+        xml.start("DartFile", {"version": "1.0"})
+        
+        # Create DartSequencerDescriptor
+        xml.start("DartSequencerDescriptor", {"sequenceName": "sequence;;sequence"})
+        
+        # Create entries section
+        xml.start("DartSequencerDescriptorEntries")
+        
+        # Create primary group for parameters
+        xml.start("DartSequencerDescriptorGroup", {"currentDisplayedPage": "1", "groupName": "group1"})
+        
+        # Add entries based on parameters_to_vary
+        
+        # Scale entries
+        if params_to_vary['scale'] and scales:
+            rand = rd.random
             for i in range(num_trees):
-                trunk_temp_entry = ET.SubElement(group, "DartSequencerDescriptorEntry")
-                trunk_temp_args = [temp_list[i + num_trees + 1] for temp_list in temp_values]
-                trunk_temp_entry.set("args", ";".join(trunk_temp_args))
-                trunk_temp_entry.set("propertyName", f"Coeff_diff.Temperatures.ThermalFunction[{2 + 2 * i}].meanT")
-                trunk_temp_entry.set("type", "enumerate")
-    
-    # Chlorophyll (Cab) entries
-    if params_to_vary['chlorophyl']:
-        for i in range(num_trees):
-            cab_entry = ET.SubElement(group, "DartSequencerDescriptorEntry")
-            # Use tree-specific chlorophyll values
-            tree_cab_values = cab_values[i]
-            cab_entry.set("args", ";".join(tree_cab_values))
-            # Use offset for LambertianMulti index
-            lambertian_index = i + offset
-            cab_entry.set("propertyName", f"Coeff_diff.Surfaces.LambertianMultiFunctions.LambertianMulti[{lambertian_index}].Lambertian.ProspectExternalModule.ProspectExternParameters.Cab")
-            cab_entry.set("type", "enumerate")
-    
-    # Water thickness (Cw) entries
-    if params_to_vary['water_thickness']:
-        for i in range(num_trees):
-            cw_entry = ET.SubElement(group, "DartSequencerDescriptorEntry")
-            # Use tree-specific water content values
-            tree_cw_values = cw_values[i]
-            cw_entry.set("args", ";".join(tree_cw_values))
-            # Use offset for LambertianMulti index
-            lambertian_index = i + offset
-            cw_entry.set("propertyName", f"Coeff_diff.Surfaces.LambertianMultiFunctions.LambertianMulti[{lambertian_index}].Lambertian.ProspectExternalModule.ProspectExternParameters.Cw")
-            cw_entry.set("type", "enumerate")
-    
-    # Handle multi_sol setting
-    if config['simulation_settings']['multi_sol']:
-        soils = get_available_soils(config_path)
-        if not soils or len(soils) == 0:
-            print("No valid soils found. Using default soil configuration.")
-            # No need to add soil-specific entries
-        else:
-            print(f"Found {len(soils)} valid soil(s). Adding soil entries to sequence.")
-            
-            # Create a dedicated group for soil parameters
-            soil_group = ET.SubElement(entries, "DartSequencerDescriptorGroup")
-            soil_group.set("currentDisplayedPage", "1")
-            soil_group.set("groupName", "group_soil")
-            
-            # Format soil identifiers
-            soil_identifiers = [f"soil_{soil}" for soil in soils]
-            
-            # Create entry for soil optical property
-            soil_entry = ET.SubElement(soil_group, "DartSequencerDescriptorEntry")
-            soil_entry.set("args", ";".join(soil_identifiers))
-            soil_entry.set("propertyName", "Maket.Soil.OpticalPropertyLink.ident")
-            soil_entry.set("type", "enumerate")
+                # Generate scale deviation for this object
+                scale = scales[i]
+                scale_args = ";".join([f"{scale * (0.8 + 0.4 * rand())}" for _ in range(nbr_simulation)])
+                
+                # Add scale entries (same values on all three axes)
+                for axis in ['x', 'y', 'z']:
+                    xml.entry(scale_args, SCALE_PROPERTY % (i, axis))
+        
+        # Temperature entries
+        if params_to_vary['tree_temperature'] or params_to_vary['soil_temperature']:
+            temp_args = join_rows(temp_columns)
             
-            # Create entry for indexFctPhase
-            phase_indices = [str(i) for i in range(len(soils))]  #
-            phase_entry = ET.SubElement(soil_group, "DartSequencerDescriptorEntry")
-            phase_entry.set("args", ";".join(phase_indices))
-            phase_entry.set("propertyName", "Maket.Soil.OpticalPropertyLink.indexFctPhase")
-            phase_entry.set("type", "enumerate")
+            # Soil temperature (if enabled)
+            if params_to_vary['soil_temperature']:
+                xml.entry(temp_args[0], THERMAL_MEAN_T % 0)
             
-            print(f"Added soil entries with identifiers: {', '.join(soil_identifiers)}")
-            print(f"Added phase indices: {', '.join(phase_indices)}")
-    
-    # Add DartSequencerPreferences
-    preferences = ET.SubElement(descriptor, "DartSequencerPreferences")
-    preferences_attrs = {
-        "atmosphereMaketLaunched": "true",
-        "dartLaunched": "true",
-        "deleteAll": "false",
-        "deleteAtmosphere": "false",
-        "deleteAtmosphereMaket": "false",
-        "deleteBandFolder": "false",
-        "deleteDartLut": "false",
-        "deleteDartSequenceur": "false",
-        "deleteDartTxt": "false",
-        "deleteDirection": "false",
-        "deleteInputs": "false",
-        "deleteLibPhase": "false",
-        "deleteMaket": "false",
-        "deleteMaketTreeResults": "false",
-        "deletePlyFolder": "false",
-        "deleteScnFiles": "false",
-        "deleteTreePosition": "false",
-        "deleteTriangles": "false",
-        "demGeneratorLaunched": "false",
-        "directionLaunched": "false",
-        "displayEnabled": "true",
-        "hapkeLaunched": "false",
-        "individualDisplayEnabled": "false",
-        "maketLaunched": "true",
-        "numberOfEnumerateValuesDisplayed": "1000",
-        "numberParallelThreads": "4",
-        "phaseLaunched": "true",
-        "prospectLaunched": "true",
-        "triangleFileProcessorLaunched": "true",
-        "useBroadBand": "true",
-        "useSceneSpectra": "true",
-        "vegetationLaunched": "true",
-        "zippedResults": "false"
-    }
-    for key, value in preferences_attrs.items():
-        preferences.set(key, value)
-    
-    # Add DartLutPreferences
-    lut_prefs = ET.SubElement(descriptor, "DartLutPreferences")
-    lut_attrs = {
-        "addedDirection": "false",
-        "atmosToa": "false",
-        "atmosToaOrdre": "false",
-        "coupl": "true",
-        "fluorescence": "true",
-        "generateLUT": "false",
-        "iterx": "true",
-        "luminance": "true",
-        "maketCoverage": "false",
-        "ordre": "true",
-        "otherIter": "true",
-        "phiMax": "",
-        "phiMin": "",
-        "productsPerType": "false",
-        "reflectance": "true",
-        "sensor": "true",
-        "storeIndirect": "false",
-        "thetaMax": "",
-        "thetaMin": "",
-        "toa": "true"
-    }
-    for key, value in lut_attrs.items():
-        lut_prefs.set(key, value)
-    
-    # Convert to string with pretty printing
-    xmlstr = minidom.parseString(ET.tostring(root)).toprettyxml(indent="    ")
-    
-    # Write to file
-    output_path = os.path.join(config['paths']['simulation_path'], "sequence.xml")
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-        f.write(xmlstr[xmlstr.find("\n")+1:])
+            # Tree temperatures (if enabled)
+            if params_to_vary['tree_temperature']:
+                # Leaf temperatures
+                for i in range(num_trees):
+                    xml.entry(temp_args[i + 1], THERMAL_MEAN_T % (1 + 2 * i))
+                
+                # Trunk temperatures
+                for i in range(num_trees):
+                    xml.entry(temp_args[i + num_trees + 1], THERMAL_MEAN_T % (2 + 2 * i))
+        
+        # Chlorophyll (Cab) entries
+        if params_to_vary['chlorophyl']:
+            cab_joined = join_rows(cab_values.tolist())
+            for i in range(num_trees):
+                # Use tree-specific chlorophyll values and offset for LambertianMulti index
+                lambertian_index = i + offset
+                xml.entry(cab_joined[i], PROSPECT_PREFIX + str(lambertian_index) + PROSPECT_SUFFIX + "Cab")
+        
+        # Water thickness (Cw) entries
+        if params_to_vary['water_thickness']:
+            cw_joined = join_rows(cw_values.tolist())
+            for i in range(num_trees):
+                # Use tree-specific water content values and offset for LambertianMulti index
+                lambertian_index = i + offset
+                xml.entry(cw_joined[i], PROSPECT_PREFIX + str(lambertian_index) + PROSPECT_SUFFIX + "Cw")
+        
+        xml.end("DartSequencerDescriptorGroup")
+        
+        # Handle multi_sol setting
+        if config['simulation_settings']['multi_sol']:
+            if not soils or len(soils) == 0:
+                print("No valid soils found. Using default soil configuration.")
+                # No need to add soil-specific entries
+            else:
+                print(f"Found {len(soils)} valid soil(s). Adding soil entries to sequence.")
+                
+                # Create a dedicated group for soil parameters
+                xml.start("DartSequencerDescriptorGroup", {"currentDisplayedPage": "1", "groupName": "group_soil"})
+                
+                # Format soil identifiers
+                soil_identifiers = [f"soil_{soil}" for soil in soils]
+                
+                # Create entry for soil optical property
+                xml.entry(";".join(soil_identifiers), "Maket.Soil.OpticalPropertyLink.ident")
+                
+                # Create entry for indexFctPhase
+                phase_indices = [str(i) for i in range(len(soils))]
+                xml.entry(";".join(phase_indices), "Maket.Soil.OpticalPropertyLink.indexFctPhase")
+                
+                xml.end("DartSequencerDescriptorGroup")
+                
+                print(f"Added soil entries with identifiers: {', '.join(soil_identifiers)}")
+                print(f"Added phase indices: {', '.join(phase_indices)}")
+        
+        xml.end("DartSequencerDescriptorEntries")
+        
+        # Add DartSequencerPreferences
+        xml.element("DartSequencerPreferences", SEQUENCER_PREFERENCES)
+        
+        # Add DartLutPreferences
+        xml.element("DartLutPreferences", LUT_PREFERENCES)
+        
+        xml.end("DartSequencerDescriptor")
+        xml.end("DartFile")
     
     print(f"sequence.xml has been generated successfully.")
 
-if __name__ == "__main__":
+def main():
     # Get the directory where the script is located
     script_dir = os.path.dirname(os.path.abspath(__file__))
     config_path = os.path.join(script_dir, "config.json")
-    create_sequence_xml(config_path)
\ No newline at end of file
+    create_sequence_xml(config_path)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
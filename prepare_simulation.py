@@ -8,44 +8,64 @@ a sequence of specialized scripts to set up all required components.
 
 import os
 import sys
-import json
 import time
 import importlib
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from config_loader import get_config
 
-def load_config():
-    """Load configuration from config.json file"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, "config.json")
-    with open(config_path, 'r') as f:
-        return json.load(f)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(SCRIPT_DIR, "config.json")
+
+# Preparation scripts that must be present next to this file
+REQUIRED_SCRIPTS = [
+    "update_coeff_diff.py",
+    "update_maket.py",
+    "update_objects.py",
+    "generate_sequence_from_config.py"
+]
+
+# Scripts that must wait for another script to finish before they start
+SCRIPT_DEPENDENCIES = {
+    # update_maket reads the soil definitions written to coeff_diff.xml
+    "update_maket.py": "update_coeff_diff.py",
+}
+
+# Modules already imported by run_script, keyed by module name
+_imported_modules = {}
 
 def run_script(script_name, module_name=None):
     """Run a script either by importing it or as a subprocess"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    script_path = os.path.join(script_dir, script_name)
+    script_path = os.path.join(SCRIPT_DIR, script_name)
     
     print(f"\n{'='*80}\nRunning {script_name}...\n{'='*80}")
     
     if module_name and os.path.exists(script_path):
+        module = None
         try:
-            # Try to import and run the module
-            module = importlib.import_module(module_name)
-            if hasattr(module, 'main'):
+            # Try to import the module (once per process)
+            module = _imported_modules.get(module_name)
+            if module is None:
+                module = _imported_modules[module_name] = importlib.import_module(module_name)
+        except (ImportError, ModuleNotFoundError) as e:
+            print(f"Error importing {module_name}: {str(e)}")
+            print(f"Trying to run as subprocess instead...")
+        
+        if module is not None and hasattr(module, 'main'):
+            # Errors raised by main() are real failures, not a reason to re-run the script
+            try:
                 module.main()
-            else:
-                #print(f"Warning: {script_name} doesn't have a main() function, running as script")
-                if script_path.endswith('.py'):
-                    subprocess.run([sys.executable, script_path], check=True)
-                else:
-                    subprocess.run([script_path], check=True)
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    print(f"Warning: {script_name} exited with code: {e.code}")
+                    return False
+            except Exception as e:
+                print(f"Error running {script_name}: {str(e)}")
+                return False
             print(f"\n{script_name} completed successfully.\n")
             return True
-        except Exception as e:
-            print(f"Error importing {module_name}: {str(e)}")
-            print(f"Trying to run as subprocess instead...")
     
-    # Run as subprocess if import fails or module_name isn't provided
+    # Run as subprocess if import fails, the script has no main() or module_name isn't provided
     try:
         if script_path.endswith('.py'):
             result = subprocess.run([sys.executable, script_path], check=False)
@@ -65,21 +85,41 @@ def run_script(script_name, module_name=None):
         print(f"Unexpected error running {script_name}: {str(e)}")
         return False
 
+def run_scripts_concurrently(scripts_to_run):
+    """Run preparation scripts in parallel worker processes, honouring SCRIPT_DEPENDENCIES"""
+    results = {}
+    pending = list(scripts_to_run)
+    futures = {}
+    
+    # Each worker imports only the module of the script it runs (in run_script)
+    with ProcessPoolExecutor(max_workers=len(scripts_to_run)) as executor:
+        def submit_ready():
+            for script, module in list(pending):
+                dependency = SCRIPT_DEPENDENCIES.get(script)
+                if dependency is None or dependency in results:
+                    pending.remove((script, module))
+                    futures[executor.submit(run_script, script, module)] = script
+        
+        submit_ready()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                script = futures.pop(future)
+                try:
+                    results[script] = future.result()
+                except Exception as e:
+                    print(f"Error running {script} in worker process: {str(e)}")
+                    results[script] = False
+            submit_ready()
+    
+    return results
+
 def check_prerequisites():
     """Check if all required scripts exist"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    required_scripts = [
-        "update_coeff_diff.py", 
-        "update_maket.py", 
-        "update_objects.py", 
-        "generate_sequence_from_config.py"
-    ]
-    
-    missing_scripts = []
-    for script in required_scripts:
-        script_path = os.path.join(script_dir, script)
-        if not os.path.exists(script_path):
-            missing_scripts.append(script)
+    # One directory read instead of one stat per script
+    with os.scandir(SCRIPT_DIR) as it:
+        present = {entry.name for entry in it}
+    missing_scripts = [script for script in REQUIRED_SCRIPTS if script not in present]
     
     if missing_scripts:
         print("Warning: The following required scripts are missing:")
@@ -111,15 +151,14 @@ def main():
     print("\n=== DART Simulation Preparation ===\n")
     
     # Check if config.json exists
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, "config.json")
+    config_path = CONFIG_PATH
     if not os.path.exists(config_path):
         print(f"Error: Configuration file not found: {config_path}")
         return 1
     
     # Load configuration
     try:
-        config = load_config()
+        config = get_config(config_path)
         print("Configuration loaded successfully")
     except Exception as e:
         print(f"Error loading configuration: {str(e)}")
@@ -146,9 +185,9 @@ def main():
     ]
     
     success = True
-    for script, module in scripts_to_run:
-        script_success = run_script(script, module)
-        if not script_success:
+    results = run_scripts_concurrently(scripts_to_run)
+    for script, _ in scripts_to_run:
+        if not results.get(script):
             print(f"Warning: {script} did not complete successfully")
             success = False
     
@@ -2,6 +2,18 @@ import os
 import json
 import sys
 import xml.etree.ElementTree as ET
+from functools import lru_cache
+from config_loader import get_config
+
+try:
+    from lxml import etree
+    XML_PARSE_ERRORS = (ET.ParseError, etree.XMLSyntaxError)
+except ImportError:
+    etree = None
+    XML_PARSE_ERRORS = (ET.ParseError,)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(SCRIPT_DIR, "config.json")
 
 def check_soil_band_files(soil_factor_path, spectral_info):
     """
@@ -21,20 +33,30 @@ def check_soil_band_files(soil_factor_path, spectral_info):
     num_bands = len(spectral_info)
     valid_soils = []
     
-    # Get all soil folders
-    soil_folders = [f for f in os.listdir(soil_factor_path) 
-                   if os.path.isdir(os.path.join(soil_factor_path, f))]
+    # Get all soil folders (DirEntry.is_dir uses the cached dirent type, no extra stat)
+    with os.scandir(soil_factor_path) as it:
+        soil_entries = [entry for entry in it if entry.is_dir(follow_symlinks=False)]
     
-    for folder in soil_folders:
-        folder_path = os.path.join(soil_factor_path, folder)
-        
-        # Count txt files in the folder
-        txt_files = [f for f in os.listdir(folder_path) if f.endswith('.txt')]
-        num_files = len(txt_files)
+    for soil_entry in soil_entries:
+        folder = soil_entry.name
+        
+        # Count txt files in the folder, stopping as soon as there are too many
+        txt_files = []
+        num_files = 0
+        with os.scandir(soil_entry.path) as it:
+            for entry in it:
+                if entry.name.endswith('.txt') and entry.is_file(follow_symlinks=False):
+                    num_files += 1
+                    if num_files > num_bands:
+                        break
+                    txt_files.append(entry.name)
         
         if num_files != num_bands:
-            print(f"WARNING: Soil folder '{folder}' has {num_files} txt files, expected {num_bands} files")
-            print(f"  Found files: {', '.join(txt_files)}")
+            if num_files > num_bands:
+                print(f"WARNING: Soil folder '{folder}' has more than {num_bands} txt files, expected {num_bands} files")
+            else:
+                print(f"WARNING: Soil folder '{folder}' has {num_files} txt files, expected {num_bands} files")
+            print(f"  Found files: {', '.join(txt_files)}{', ...' if num_files > num_bands else ''}")
             continue
         
         valid_soils.append(folder)
@@ -48,9 +70,21 @@ def check_soil_band_files(soil_factor_path, spectral_info):
     
     return valid_soils
 
+def add_band_info(band_info, band):
+    """Record one SpectralIntervalsProperties element's bandNumber -> spectralDartMode in band_info"""
+    band_number = band.get("bandNumber")
+    spectral_mode = band.get("spectralDartMode")
+    if band_number is None or spectral_mode is None:
+        return
+    try:
+        band_info[int(band_number)] = int(spectral_mode)
+    except ValueError:
+        print(f"WARNING: Skipping band with invalid values: bandNumber={band_number}, spectralDartMode={spectral_mode}")
+
 def get_spectral_intervals(simulation_path):
     """
     Check phase.xml in the simulation input folder and extract spectral intervals information.
+    The result is memoized per phase.xml version and shared between callers, which must not modify it.
     
     Args:
         simulation_path (str): Path to the simulation directory
@@ -58,32 +92,58 @@ def get_spectral_intervals(simulation_path):
     Returns:
         dict: Dictionary containing band numbers and their spectralDartMode values
     """
+    # Construct path to phase.xml
+    phase_xml_path = os.path.join(simulation_path, "input", "phase.xml")
+    
+    # Check if file exists; a missing file is not cached, so it is picked up once it is created
+    try:
+        mtime_ns = os.stat(phase_xml_path).st_mtime_ns
+    except FileNotFoundError:
+        print(f"WARNING: phase.xml not found at: {phase_xml_path}")
+        return None
+    return _read_spectral_intervals(os.path.abspath(phase_xml_path), mtime_ns)
+
+@lru_cache(maxsize=4)
+def _read_spectral_intervals(phase_xml_path, mtime_ns):
+    # Keyed on the modification time, so a fixed or rewritten phase.xml is read again
     try:
-        # Construct path to phase.xml
-        phase_xml_path = os.path.join(simulation_path, "input", "phase.xml")
-        
-        # Check if file exists
-        if not os.path.exists(phase_xml_path):
-            print(f"WARNING: phase.xml not found at: {phase_xml_path}")
-            return None
-        
-        # Parse XML file
-        tree = ET.parse(phase_xml_path)
-        root = tree.getroot()
-        
-        # Find SpectralIntervals element
-        spectral_intervals = root.find(".//SpectralIntervals")
-        if spectral_intervals is None:
-            print("WARNING: No SpectralIntervals found in phase.xml")
-            return None
-        
         # Extract band information
         band_info = {}
-        for band in spectral_intervals.findall("SpectralIntervalsProperties"):
-            band_number = band.get("bandNumber")
-            spectral_mode = band.get("spectralDartMode")
-            if band_number is not None and spectral_mode is not None:
-                band_info[int(band_number)] = int(spectral_mode)
+        if etree is not None:
+            # Stream phase.xml with lxml, stopping at the end of the first SpectralIntervals
+            found_intervals = False
+            context = etree.iterparse(phase_xml_path, events=("end",),
+                                      tag=("SpectralIntervals", "SpectralIntervalsProperties"))
+            for _, elem in context:
+                if elem.tag == "SpectralIntervals":
+                    found_intervals = True
+                    break
+                parent = elem.getparent()
+                if parent is not None and parent.tag == "SpectralIntervals":
+                    add_band_info(band_info, elem)
+                # Drop parsed bands to keep memory flat
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+            del context
+            
+            if not found_intervals:
+                print("WARNING: No SpectralIntervals found in phase.xml")
+                return None
+        else:
+            # Parse XML file
+            tree = ET.parse(phase_xml_path)
+            root = tree.getroot()
+            
+            # Find SpectralIntervals element
+            # iter() runs in the C accelerator, find() goes through the Python ElementPath evaluator
+            spectral_intervals = next((elem for elem in root.iter("SpectralIntervals") if elem is not root), None)
+            if spectral_intervals is None:
+                print("WARNING: No SpectralIntervals found in phase.xml")
+                return None
+            
+            for band in spectral_intervals.findall("SpectralIntervalsProperties"):
+                add_band_info(band_info, band)
         
         if not band_info:
             print("WARNING: No valid spectral intervals found in phase.xml")
@@ -96,7 +156,7 @@ def get_spectral_intervals(simulation_path):
         
         return band_info
         
-    except ET.ParseError as e:
+    except XML_PARSE_ERRORS as e:
         print(f"ERROR: Invalid XML in phase.xml: {str(e)}")
         return None
     except Exception as e:
@@ -115,9 +175,8 @@ def check_soil_factor_path(config_path):
         bool: True if path exists and contains valid soil folders, False otherwise
     """
     try:
-        # Read configuration
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        # Read configuration (parsed once per process)
+        config = get_config(config_path)
         
         # Get paths and settings
         soil_factor_path = config['paths']['soil_factor_path']
@@ -171,12 +230,8 @@ def check_soil_factor_path(config_path):
         return False
 
 def main():
-    # Get the directory where the script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, "config.json")
-    
     # Check soil factor path
-    if not check_soil_factor_path(config_path):
+    if not check_soil_factor_path(CONFIG_PATH):
         print("Soil factor path check failed. Please check the warnings above.")
         sys.exit(1)
     
@@ -1,77 +1,89 @@
 import os
+import re
+import asyncio
 import sys
-import json
-from subprocess import Popen, STDOUT
-import subprocess
-import random as rd
-
-def load_config():
-    """Load configuration from config.json file"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, "config.json")
-    with open(config_path, 'r') as f:
-        return json.load(f)
+from subprocess import Popen, PIPE, STDOUT
+from functools import lru_cache
+from pathlib import PurePosixPath, PureWindowsPath
+from config_loader import get_config
 
+IS_WINDOWS = sys.platform == 'win32'
+
+# DART tool scripts: .bat files run directly by CreateProcess on Windows, .sh files run through bash elsewhere
+SCRIPT_EXT = '.bat' if IS_WINDOWS else '.sh'
+SHELL_PREFIX = () if IS_WINDOWS else ('bash',)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(SCRIPT_DIR, "config.json")
+
+# Sequencer output markers: prompts to answer (groups 1 and 2) and the end-of-run line (group 3)
+LOG_MARKERS = (b"Press any key to continue", b"Terminate batch job", b"Total processing time")
+LOG_MARKERS_RE = re.compile(b"|".join(b"(" + re.escape(marker) + b")" for marker in LOG_MARKERS))
+
+# Bytes kept between reads: enough for a marker split across two chunks, never more
+MARKER_TAIL_SIZE = max(len(marker) for marker in LOG_MARKERS) - 1
+
+# Size of each read from the sequencer's stdout pipe
+READ_CHUNK_SIZE = 1 << 16
+
+# Environment inherited by every DART process, read from the C environ once
+BASE_ENV = os.environ.copy()
+
+# Userspace buffer for run.log; it is only flushed when full or when the run ends
+LOG_BUFFER_SIZE = 1 << 20
+
+@lru_cache(maxsize=4)
 def get_dart_paths(simulation_path):
-    """Derive DART paths from simulation path"""
+    """Derive DART paths from simulation path (memoized: the simulation path rarely changes)"""
     # Print original path for debugging
     #print(f"Original simulation path: {simulation_path}")
     
-    # Handle mixed slashes by replacing all with the system separator
-    simulation_path = simulation_path.replace('/', os.sep).replace('\\', os.sep)
-    
-    # Parse path based on whether it's a Windows path with drive letter
-    if sys.platform == 'win32' and len(simulation_path) > 1 and simulation_path[1] == ':':
-        # Windows path with drive letter (e.g., C:\Users\...)
-        drive = simulation_path[:2]  # Just C: without the slash
-        rest_of_path = simulation_path[2:].strip(os.sep)  # Remove leading and trailing slashes
-        path_parts = rest_of_path.split(os.sep)
-        path_parts = [p for p in path_parts if p]  # Remove empty strings
-        path_parts.insert(0, drive)  # Add drive back to path parts
+    # Parse the path once; PureWindowsPath accepts both slash styles and splits off the drive
+    if IS_WINDOWS:
+        path_type = PureWindowsPath
     else:
-        # Unix-like path or path without drive letter
-        path_parts = simulation_path.strip(os.sep).split(os.sep)
-        path_parts = [p for p in path_parts if p]  # Remove empty strings
+        path_type = PurePosixPath
+        simulation_path = simulation_path.replace('\\', '/')
+    parsed = path_type(simulation_path)
+    # Rebuilt paths are always rooted: at the drive on Windows when there is one, at the separator otherwise
+    prefix = parsed.drive + os.sep
+    path_parts = parsed.parts[1:] if parsed.anchor else parsed.parts
     
     #print(f"Path parts: {path_parts}")
     
-    # Find 'DART' and 'user_data' in the path
+    # Find 'DART' and 'user_data' in the path in a single, case-insensitive scan
     dart_index = -1
     user_data_index = -1
-    
     for i, part in enumerate(path_parts):
-        if part.upper() == 'DART':  # Case-insensitive match for robustness
+        lowered = part.lower()
+        if lowered == 'dart':
             dart_index = i
-        elif part.lower() == 'user_data':  # Case-insensitive match for robustness
+        elif lowered == 'user_data':
             user_data_index = i
     
+    def build(last_index):
+        # Rebuild the path up to and including path_parts[last_index]
+        return prefix + os.sep.join(path_parts[:last_index + 1])
+    
     if dart_index == -1:
         # If we can't find DART, let's use reasonable defaults
         print("Warning: Could not find 'DART' in the path. Using defaults.")
-        if sys.platform == 'win32':
+        if IS_WINDOWS:
             base_path = "C:\\Users\\LENOVO\\DART"
         else:
             base_path = "/Users/LENOVO/DART"
     else:
-        # Create the base path including the drive letter if on Windows
-        if sys.platform == 'win32' and path_parts[0].endswith(':'):
-            base_path = path_parts[0] + os.sep + os.sep.join(path_parts[1:dart_index+1])
-        else:
-            base_path = os.sep + os.sep.join(path_parts[:dart_index+1])
+        base_path = build(dart_index)
     
     if user_data_index == -1:
         # If we can't find user_data, use the base_path/user_data
         print("Warning: Could not find 'user_data' in the path. Using defaults.")
         user_data_path = os.path.join(base_path, "user_data")
     else:
-        # Create the user_data path including the drive letter if on Windows
-        if sys.platform == 'win32' and path_parts[0].endswith(':'):
-            user_data_path = path_parts[0] + os.sep + os.sep.join(path_parts[1:user_data_index+1])
-        else:
-            user_data_path = os.sep + os.sep.join(path_parts[:user_data_index+1])
+        user_data_path = build(user_data_index)
     
     # Handle tools path based on platform
-    if sys.platform == 'win32':
+    if IS_WINDOWS:
         tools_subpath = os.path.join('tools', 'windows')
     else:
         tools_subpath = os.path.join('tools', 'linux')
@@ -86,9 +98,25 @@ def get_dart_paths(simulation_path):
         'DART_TOOLS': os.path.join(base_path, tools_subpath)
     }
 
-def run_simulation(simulation, DART_HOME, DART_LOCAL, DART_TOOLS, direction=True, phase=True, maket=True, dart=True):
-    """Run a DART simulation with specified parameters"""
-    ext = '.bat' if sys.platform == 'win32' else '.sh'
+@lru_cache(maxsize=4)
+def get_dart_env(DART_HOME, DART_LOCAL):
+    """Environment for the DART tools (memoized alongside get_dart_paths; callers must not modify it)"""
+    return {**BASE_ENV, 'DART_HOME': DART_HOME, 'DART_LOCAL': DART_LOCAL}
+
+def open_log(path):
+    """Open a run log for binary writes through LOG_BUFFER_SIZE bytes of userspace buffer"""
+    # O_APPEND: writes made by DART through an inherited copy of the descriptor always land at the end
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+    return os.fdopen(os.open(path, flags, 0o644), 'wb', buffering=LOG_BUFFER_SIZE)
+
+def close_log(log):
+    """Flush and sync the sequence log once, at the end of the run, then close it"""
+    log.flush()
+    os.fsync(log.fileno())
+    log.close()
+
+def run_simulation(simulation, DART_HOME, DART_LOCAL, DART_TOOLS, direction=True, phase=True, maket=True, dart=True, env=None):
+    """Run a DART simulation with specified parameters (env defaults to get_dart_env(DART_HOME, DART_LOCAL))"""
     if direction and phase and maket and dart:
         steps = ['dart-full']
     else:
@@ -102,121 +130,147 @@ def run_simulation(simulation, DART_HOME, DART_LOCAL, DART_TOOLS, direction=True
         if dart:
             steps.append('dart-only')
 
-    env = os.environ.copy()
-    env['DART_HOME'] = DART_HOME
-    env['DART_LOCAL'] = DART_LOCAL
+    if env is None:
+        env = get_dart_env(DART_HOME, DART_LOCAL)
 
     process = None
-    log = open('run.log', 'w')
+    log = open_log('run.log')
+    
+    # The simulation argument is the same for every step
+    rel = simulation.split(os.sep + 'simulations' + os.sep, 1)[-1]
 
     for step in steps:
-        cmd = (['bash'] if sys.platform != 'win32' else ['cmd', '/c']) + [step + ext, simulation.split(os.sep + 'simulations' + os.sep, 1)[-1]]
+        cmd = [*SHELL_PREFIX, os.path.join(DART_TOOLS, step + SCRIPT_EXT), rel]
         print(f"Executing command: {cmd}")
-        process = Popen(cmd, cwd=DART_TOOLS, env=env, stdout=log, stderr=STDOUT, shell=False, universal_newlines=True)
+        process = Popen(cmd, cwd=DART_TOOLS, env=env, stdin=PIPE, stdout=log, stderr=STDOUT, shell=False, universal_newlines=True)
+        # Pre-fill the answer to a "Press any key" prompt and close stdin, so later reads see EOF instead of blocking
+        try:
+            process.stdin.write("\n")
+            process.stdin.close()
+        except BrokenPipeError:
+            # The step exited before reading stdin; its return code below reports why
+            pass
         if process.wait() > 0:
             break
     log.close()
     return 0 if process is None else process.returncode
 
-def run_sequence(sequencexml, DART_HOME, DART_LOCAL, DART_TOOLS, start=True):
-    """Run a DART sequence with specified parameters"""
-    ext = '.bat' if sys.platform == 'win32' else '.sh'
-    state = "-start" if start else "-continue"
-    env = os.environ.copy()
-    env['DART_HOME'] = DART_HOME
-    env['DART_LOCAL'] = DART_LOCAL
-    
-    # Ensure consistent path separators
-    if sys.platform == 'win32':
-        sequencexml = sequencexml.replace('/', '\\')
-        DART_LOCAL = DART_LOCAL.replace('/', '\\')
+def get_sequence_rel_path(sequencexml):
+    """Return sequencexml relative to the 'simulations' directory, as dart-sequence expects it, or None"""
+    # Ensure consistent path separators (normpath turns '/' into '\\' on Windows)
+    sequencexml = os.path.normpath(sequencexml)
     
     try:
         # Extract just the simulation name and sequence.xml
-        sep = '\\' if sys.platform == 'win32' else '/'
-        parts = sequencexml.split(f'simulations{sep}')
+        parts = sequencexml.split(f'simulations{os.sep}')
         if len(parts) != 2:
             raise ValueError("Path must contain 'simulations' directory")
         rel_path = parts[1]  # This will be "test/sequence.xml" or similar
         print(f"Using relative path: {rel_path}")
+        return rel_path
         
     except (ValueError, IndexError) as e:
         print(f"Error processing path: {str(e)}")
-        return 1
+        return None
+
+async def run_sequence_async(rel_path, DART_TOOLS, env, start=True):
+    """Run a DART sequence with specified parameters, supervising its output without blocking the event loop"""
+    # rel_path comes from get_sequence_rel_path; env already holds DART_HOME and DART_LOCAL
+    state = "-start" if start else "-continue"
     
     log_file = 'run.log'
-    log = open(log_file, 'w')
+    log = open_log(log_file)
     
-    # Construct command differently for Windows vs Linux
-    if sys.platform == 'win32':
-        cmd = ['cmd', '/c', os.path.join(DART_TOOLS, f"dart-sequence{ext}"), rel_path, state]
-    else:
-        cmd = ['bash', os.path.join(DART_TOOLS, f"dart-sequence{ext}"), rel_path, state]
+    cmd = [*SHELL_PREFIX, os.path.join(DART_TOOLS, f"dart-sequence{SCRIPT_EXT}"), rel_path, state]
     
     print(f"Executing sequence command: {cmd}")
     #print(f"Working directory: {DART_TOOLS}")
     #print(f"Environment variables: DART_HOME={DART_HOME}, DART_LOCAL={DART_LOCAL}")
     
+    process = None
     try:
-        # Use subprocess.Popen with real-time output handling
-        process = subprocess.Popen(
-            cmd, 
-            env=env, 
-            shell=False, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.STDOUT, 
-            stdin=subprocess.PIPE,  # Add stdin pipe for interaction
-            universal_newlines=True,
-            bufsize=1  # Line buffered
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            stdin=asyncio.subprocess.PIPE  # Add stdin pipe for interaction
         )
         
         print("Process started. Waiting for output...")
+        sys.stdout.flush()
         
-        # Read and print output in real-time
-        for line in process.stdout:
-            print(line, end='')  # Print to console
-            log.write(line)      # Write to log file
+        # Read and print output in real-time, one block (not one line) at a time
+        console = getattr(sys.stdout, 'buffer', None)
+        if console is not None:
+            write_console, flush_console = console.write, console.flush
+        else:
+            def write_console(data):
+                sys.stdout.write(data.decode(errors='replace'))
+            flush_console = sys.stdout.flush
+        write_log = log.write
+        find_markers = LOG_MARKERS_RE.finditer
+        pending = b""  # Unmatched tail of the previous block, so markers split across reads are found
+        finished = False
+        while not finished:
+            chunk = await process.stdout.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            write_console(chunk)      # Print to console
+            if len(chunk) < READ_CHUNK_SIZE:
+                # Short read: the pipe is drained, so show it now; after a full read more output is already waiting
+                flush_console()
+            write_log(chunk)          # Write to log file
             
-            # Automatically respond to "Press any key to continue..." and "Terminate batch job (Y/N)?"
-            if "Press any key to continue" in line or "Terminate batch job" in line:
-                process.stdin.write('\n')
-                process.stdin.flush()
+            buffer = pending + chunk
+            scanned = 0
+            for match in find_markers(buffer):
+                scanned = match.end()
+                
+                # Terminate process if "Total processing time" is detected
+                if match.lastindex == 3:
+                    flush_console()
+                    print("\nTotal processing time detected. Terminating process.")
+                    process.terminate()
+                    finished = True
+                    break
+                
+                # Automatically respond to "Press any key to continue..." and "Terminate batch job (Y/N)?"
+                flush_console()
+                log.flush()  # The run is idle until answered, so the log is up to date while it waits
+                process.stdin.write(b'\n')
+                await process.stdin.drain()
             
-            # Terminate process if "Total processing time" is detected
-            if "Total processing time" in line:
-                print("Total processing time detected. Terminating process.")
-                process.terminate()
-                break
+            pending = buffer[max(scanned, len(buffer) - MARKER_TAIL_SIZE):]
             
         # Wait for process to complete with timeout
-        return_code = process.wait(timeout=1800)  # 30 minute timeout
+        return_code = await asyncio.wait_for(process.wait(), timeout=1800)  # 30 minute timeout
         
         #print(f"Process completed with return code: {return_code}")
-        log.close()
+        close_log(log)
         return return_code
         
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         print("Error: Process timed out after 30 minutes")
         process.kill()
-        log.write("Process timed out after 30 minutes\n")
-        log.close()
+        log.write(b"Process timed out after 30 minutes\n")
+        close_log(log)
         return 1
     except Exception as e:
         print(f"Error executing command: {str(e)}")
-        log.write(f"Error executing command: {str(e)}\n")
-        log.close()
+        log.write(f"Error executing command: {str(e)}\n".encode())
+        close_log(log)
         return 1
 
 def main():
     # Load configuration
-    config = load_config()
+    config = get_config(CONFIG_PATH)
     
     # Extract paths from config
     simulation_path = config['paths']['simulation_path']
     
-    # Normalize path separators for Windows
-    if sys.platform == 'win32':
-        simulation_path = simulation_path.replace('/', '\\')
+    # Normalize path separators once; every path below is derived from this one
+    simulation_path = os.path.normpath(simulation_path)
     
     # Get DART paths from simulation path
     dart_paths = get_dart_paths(simulation_path)
@@ -228,23 +282,26 @@ def main():
     # Use the full simulation path for sequence.xml
     sequence_xml = os.path.join(simulation_path, "sequence.xml")
     
-    # Ensure consistent path separators
-    if sys.platform == 'win32':
-        sequence_xml = sequence_xml.replace('/', '\\')
-    
     if os.path.exists(sequence_xml):
         #print(f"Running sequence from: {sequence_xml}")
         #print(f"DART_HOME: {DART_HOME}")
         #print(f"DART_LOCAL: {DART_LOCAL}")
         #print(f"DART_TOOLS: {DART_TOOLS}")
-        result = run_sequence(sequence_xml, DART_HOME, DART_LOCAL, DART_TOOLS)
+        # Derive the sequencer arguments and environment once, not in every run
+        rel_path = get_sequence_rel_path(sequence_xml)
+        if rel_path is None:
+            return
+        env = get_dart_env(DART_HOME, DART_LOCAL)
+        
+        result = asyncio.run(run_sequence_async(rel_path, DART_TOOLS, env))
         
 
         # Save results if configured
-        if config['simulation_settings']['save_result_to_tif_json']:
-                save_script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saveTIFF.py")
-                print(f"Running save script: {save_script_path}")
-                os.system(f"python {save_script_path} {rd.random()}")
+        if config['simulation_settings'].get('save_result_to_tif_json', False):
+                # Imported here so runs that don't save results skip loading numpy/rasterio
+                import saveTIFF
+                print("Saving sequence results to GeoTIFF/JSON")
+                saveTIFF.main()
 
     else:
         print(f"Error: Sequence file not found at {sequence_xml}")
@@ -5,20 +5,33 @@ import numpy as np
 import rasterio
 from rasterio.transform import from_origin
 import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from config_loader import get_config
 from preprocess_soils import get_spectral_intervals
 
 np.seterr(divide='ignore', invalid='ignore')
 
+# Image size patterns for header files, matched on the raw bytes
+SIZE_RE = re.compile(rb'Size=(\d+)\s+(\d+)')
+NCOLS_RE = re.compile(rb'ncols\s*=\s*(\d+)')
+NROWS_RE = re.compile(rb'nrows\s*=\s*(\d+)')
+
 def load_config():
-    """Load configuration from config.json file"""
+    """Load configuration from config.json file (parsed once per process and shared, do not modify it)"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, "config.json")
-    with open(config_path, 'r') as f:
-        return json.load(f)
+    return get_config(os.path.join(script_dir, "config.json"))
+
+def scale_to_uint16(img_data, scale, out):
+    """Store img_data * scale, clipped to [0, 65535] and rounded, in the uint16 array out (img_data may be overwritten)"""
+    img_data *= scale
+    np.clip(img_data, 0, 65535, out=img_data)
+    np.rint(img_data, out=img_data)
+    out[...] = img_data
 
 def extract_size_from_config(content):
-    """Extract image dimensions from header file"""
-    size_match = re.search(r'Size=(\d+)\s+(\d+)', content)
+    """Extract image dimensions from header file content (bytes)"""
+    size_match = SIZE_RE.search(content)
     if size_match:
         columns = int(size_match.group(1))
         rows = int(size_match.group(2))
@@ -26,8 +39,8 @@ def extract_size_from_config(content):
         return columns, rows
     else:
         # Alternative format
-        ncols_match = re.search(r'ncols\s*=\s*(\d+)', content)
-        nrows_match = re.search(r'nrows\s*=\s*(\d+)', content)
+        ncols_match = NCOLS_RE.search(content)
+        nrows_match = NROWS_RE.search(content)
         if ncols_match and nrows_match:
             columns = int(ncols_match.group(1))
             rows = int(nrows_match.group(1))
@@ -44,13 +57,207 @@ def get_band_mode_dict(simulation_path):
         return {}
     return spectral_info
 
-def is_thermal_band(band_num, band_modes):
-    """Check if the band is a thermal band based on its mode"""
+def get_thermal_bands(band_modes):
+    """Return the set of thermal band numbers; bands missing from band_modes count as reflectance"""
     # SpectralDartMode = 2 indicates thermal band
-    if band_num in band_modes and band_modes[band_num] == 2:
-        return True
-    # Default to False if band not found in the mapping
-    return False
+    return frozenset(band_num for band_num, mode in band_modes.items() if mode == 2)
+
+def process_sequence(seq_path, pathsavesim, thermal_bands, num_threads='all_cpus'):
+    """Save props.json and the GeoTIFF of one sequence directory; returns True when the GeoTIFF was written
+
+    num_threads is the number of GDAL compression threads used for the GeoTIFF.
+    """
+    # float64 buffer every band image is read into; reused while the image size stays the same
+    img_data = None
+    
+    seq_dir = os.path.basename(seq_path)
+    # Create output directory for this sequence
+    savedirectory = os.path.join(pathsavesim, seq_dir)
+    print(f"\nProcessing sequence directory: {seq_dir}")
+    os.makedirs(savedirectory, exist_ok=True)
+
+    # Read and parse properties file (a missing file is reported by open, not a separate stat)
+    properties_path = os.path.join(seq_path, 'output', 'dart.sequenceur.properties')
+    props_dict = {}
+    try:
+        with open(properties_path, 'r') as g:
+            next(g, None)  # Line 0 is not part of a pair
+            
+            # Extract parameters and values, streaming lines (1, 2), (3, 4), ... as name/value pairs
+            for pair_index, (param_line, value_line) in enumerate(zip(g, g)):
+                k = 2 * pair_index + 1
+                param_line = param_line.rstrip('\n')
+                value_line = value_line.rstrip('\n')
+                if ':' in param_line and ':' in value_line:
+                    try:
+                        # Only field 1 is used, so stop splitting after the second colon
+                        param_parts = param_line.split(':', 2)
+                        value_parts = value_line.split(':', 2)
+                        
+                        if len(param_parts) > 1 and len(value_parts) > 1:
+                            param_name = param_parts[1].split('.')[-1]
+                            # Try to convert to float, but keep as string if not possible
+                            try:
+                                param_value = float(value_parts[1])
+                            except ValueError:
+                                param_value = value_parts[1].strip()  # Keep as string but strip whitespace
+                            props_dict[param_name + str(pair_index)] = param_value
+                    except (ValueError, IndexError) as e:
+                        print(f"Error parsing line {k}: {e}")
+    except FileNotFoundError:
+        print(f"Properties file not found: {properties_path}")
+        return False
+    except Exception as e:
+        print(f"Error reading properties file: {e}")
+        return False
+
+    # Save props.json
+    with open(os.path.join(savedirectory, "props.json"), "w") as outfile:
+        json.dump(props_dict, outfile)
+    print(f"Created props.json")
+
+    # Find available bands
+    band_dir = os.path.join(seq_path, 'output')
+    with os.scandir(band_dir) as it:
+        available_bands = [entry.name for entry in it if entry.name.startswith("BAND") and entry.is_dir()]
+    
+    if not available_bands:
+        print(f"No band directories found in {band_dir}")
+        return False
+        
+    print(f"Found {len(available_bands)} bands: {', '.join(available_bands)}")
+    
+    # Process band images straight into one (bands, rows, columns) array, allocated at the first band
+    stack = None
+    num_bands = 0
+    band_names = []
+    
+    # Numeric band order (BAND2 before BAND10); the number is parsed once per band
+    band_entries = sorted((int(band[4:]), band) for band in available_bands)
+    
+    for band_num, band in band_entries:
+        band_names.append(band)
+        
+        # Determine if this is a thermal band
+        is_thermal = band_num in thermal_bands
+        folder_type = "Tapp" if is_thermal else "BRF"
+        
+        # Check both BRF and Tapp folders
+        band_folder = os.path.join(band_dir, band, folder_type, "ITERX", "IMAGES_DART")
+        if not os.path.exists(band_folder):
+            # Try the alternative folder
+            alt_folder_type = "BRF" if folder_type == "Tapp" else "Tapp"
+            band_folder = os.path.join(band_dir, band, alt_folder_type, "ITERX", "IMAGES_DART")
+            if not os.path.exists(band_folder):
+                print(f"Band folder not found for {band}, skipping")
+                continue
+            print(f"Using {alt_folder_type} instead of {folder_type} for {band}")
+            folder_type = alt_folder_type
+        
+        print(f"Processing {band} as {'thermal' if is_thermal else 'reflectance'} band using {folder_type} folder")
+        
+        # Get header file
+        ima_prefixed = [filename for filename in os.listdir(band_folder) if filename.startswith("ima")]
+        if not ima_prefixed:
+            print(f"No image files found in: {band_folder}")
+            continue
+            
+        header_files = [filename for filename in ima_prefixed if filename.endswith("mpr")]
+        if not header_files:
+            print(f"No header files found in: {band_folder}")
+            continue
+            
+        header_name = header_files[0]
+        
+        # Read header file
+        try:
+            with open(os.path.join(band_folder, header_name), "rb") as header_file:
+                rows, columns = extract_size_from_config(header_file.read())
+        except Exception as e:
+            print(f"Error reading header file for {band}: {e}")
+            continue
+            
+        # Read image data
+        img_files = [filename for filename in ima_prefixed if filename.endswith("mp#")]
+        if not img_files:
+            print(f"No mp# files found for {band}")
+            continue
+
+        if len(img_files) > 1:
+            print(f"Warning: Multiple mp# files found for {band}, using the first file: {img_files[0]}")
+        
+        img_name = img_files[0]
+        
+        try:
+            # mp# images are float64; read them straight into the shared buffer, no per-band allocation
+            if img_data is None or img_data.shape != (rows, columns):
+                img_data = np.empty((rows, columns), dtype=np.double)
+            with open(os.path.join(band_folder, img_name), 'rb') as img_file:
+                # The file must hold exactly the image in the header, like the reshape of a whole-file read
+                if os.fstat(img_file.fileno()).st_size != img_data.nbytes or img_file.readinto(img_data) != img_data.nbytes:
+                    raise ValueError(f"{img_name} does not match the {rows}x{columns} image in its header")
+            #print(f"Band: {band}, Min: {np.min(img_data)}, Max: {np.max(img_data)}")
+            
+            # Convert to 16-bit based on band type
+            if is_thermal or folder_type == "Tapp":
+                # Scale temperature values appropriately
+                scale = 100.0  # Different scaling for temperature
+                #print(f"Using thermal scaling for {band}")
+            else:
+                # Regular reflectance scaling
+                scale = 10000.0
+                #print(f"Using reflectance scaling for {band}")
+            if stack is None:
+                stack = np.empty((len(available_bands), rows, columns), dtype=np.uint16)
+            # Round to the nearest step and keep values inside the uint16 range instead of truncating/wrapping
+            scale_to_uint16(img_data, scale, stack[num_bands])
+            num_bands += 1
+        except Exception as e:
+            print(f"Error processing {band}: {e}")
+    
+    if not num_bands:
+        print(f"No valid bands processed for {seq_dir}, skipping")
+        return False
+    
+    # Create GeoTIFF
+    imagename = os.path.join(savedirectory, f"{seq_dir}.tif")
+    
+    # Add georeferencing info
+    origin_x = 600000
+    origin_y = 3850000
+    pixel_size = 2.5  # 2.5 meter resolution
+    transform = from_origin(origin_x, origin_y, pixel_size, pixel_size)
+    
+    try:
+        with rasterio.open(
+            imagename, 'w',
+            driver='GTiff',
+            height=stack.shape[1],
+            width=stack.shape[2],
+            count=num_bands,
+            dtype=str(stack.dtype),
+            crs="EPSG:32632",
+            transform=transform,
+            interleave='band',
+            # Tiled, compressed output: smaller files that read back faster
+            tiled=True,
+            blockxsize=256,
+            blockysize=256,
+            compress='deflate',
+            predictor=2,
+            num_threads=num_threads,
+            BIGTIFF='IF_SAFER'
+        ) as dst:
+            # All bands in a single write
+            dst.write(stack[:num_bands])
+            for i in range(num_bands):
+                dst.set_band_description(i + 1, band_names[i])
+        
+        print(f"Successfully created GeoTIFF for {seq_dir}.")
+    except Exception as e:
+        print(f"Error creating GeoTIFF for {seq_dir}: {e}")
+        return False
+    return True
 
 def save_tiff_and_props():
     """Process sequence outputs and save as GeoTIFF and properties JSON"""
@@ -66,6 +273,7 @@ def save_tiff_and_props():
     
     # Get band mode information
     band_modes = get_band_mode_dict(simulation_path)
+    thermal_bands = get_thermal_bands(band_modes)
     
     # Path to sequence directory
     pathsim = os.path.join(simulation_path, "sequence")
@@ -81,177 +289,27 @@ def save_tiff_and_props():
         return
     
     # Get sequence directories
-    sequence_dirs = [d for d in os.listdir(pathsim) if os.path.isdir(os.path.join(pathsim, d))]
+    # DirEntry carries the file type from the directory read, so no stat per entry
+    with os.scandir(pathsim) as it:
+        sequence_entries = [entry for entry in it if entry.is_dir()]
+    sequence_dirs = [entry.name for entry in sequence_entries]
     print(f"Found {len(sequence_dirs)} sequence directories: {sequence_dirs}")
     
-    # Process each sequence
-    for seq_dir in sequence_dirs:
-        # Create output directory for this sequence
-        savedirectory = os.path.join(pathsavesim, seq_dir)
-        print(f"\nProcessing sequence directory: {seq_dir}")
-        os.makedirs(savedirectory, exist_ok=True)
-        
-        # Check properties file
-        properties_path = os.path.join(pathsim, seq_dir, 'output', 'dart.sequenceur.properties')
-        if not os.path.exists(properties_path):
-            print(f"Properties file not found: {properties_path}")
-            continue
-
-        # Read and parse properties file
-        props_dict = {}
-        try:
-            with open(properties_path, 'r') as g:
-                contenu = g.read()
-                x2 = contenu.split("\n")
-                
-                # Extract parameters and values
-                for k in range(1, len(x2) - 1, 2):
-                    if k+1 < len(x2) and ':' in x2[k] and ':' in x2[k+1]:
-                        try:
-                            param_parts = x2[k].split(':')
-                            value_parts = x2[k+1].split(':')
-                            
-                            if len(param_parts) > 1 and len(value_parts) > 1:
-                                param_name = param_parts[1].split('.')[-1]
-                                # Try to convert to float, but keep as string if not possible
-                                try:
-                                    param_value = float(value_parts[1])
-                                except ValueError:
-                                    param_value = value_parts[1].strip()  # Keep as string but strip whitespace
-                                props_dict[param_name + str(k//2)] = param_value
-                        except (ValueError, IndexError) as e:
-                            print(f"Error parsing line {k}: {e}")
-        except Exception as e:
-            print(f"Error reading properties file: {e}")
-            continue
-
-        # Save props.json
-        with open(os.path.join(savedirectory, "props.json"), "w") as outfile:
-            json.dump(props_dict, outfile)
-        print(f"Created props.json")
-
-        # Find available bands
-        band_dir = os.path.join(pathsim, seq_dir, 'output')
-        available_bands = [d for d in os.listdir(band_dir) if d.startswith("BAND") and os.path.isdir(os.path.join(band_dir, d))]
-        
-        if not available_bands:
-            print(f"No band directories found in {band_dir}")
-            continue
-            
-        print(f"Found {len(available_bands)} bands: {', '.join(available_bands)}")
-        
-        # Process band images
-        bands_arr = []
-        band_names = []
-        
-        for band in sorted(available_bands):
-            band_num = int(band.replace("BAND", ""))
-            band_names.append(band)
-            
-            # Determine if this is a thermal band
-            is_thermal = is_thermal_band(band_num, band_modes)
-            folder_type = "Tapp" if is_thermal else "BRF"
-            
-            # Check both BRF and Tapp folders
-            band_folder = os.path.join(band_dir, band, folder_type, "ITERX", "IMAGES_DART")
-            if not os.path.exists(band_folder):
-                # Try the alternative folder
-                alt_folder_type = "BRF" if folder_type == "Tapp" else "Tapp"
-                band_folder = os.path.join(band_dir, band, alt_folder_type, "ITERX", "IMAGES_DART")
-                if not os.path.exists(band_folder):
-                    print(f"Band folder not found for {band}, skipping")
-                    continue
-                print(f"Using {alt_folder_type} instead of {folder_type} for {band}")
-                folder_type = alt_folder_type
-            
-            print(f"Processing {band} as {'thermal' if is_thermal else 'reflectance'} band using {folder_type} folder")
-            
-            # Get header file
-            ima_prefixed = [filename for filename in os.listdir(band_folder) if filename.startswith("ima")]
-            if not ima_prefixed:
-                print(f"No image files found in: {band_folder}")
-                continue
-                
-            header_files = [filename for filename in ima_prefixed if filename.endswith("mpr")]
-            if not header_files:
-                print(f"No header files found in: {band_folder}")
-                continue
-                
-            header_name = header_files[0]
-            
-            # Read header file
-            try:
-                with open(os.path.join(band_folder, header_name), "rb") as header_file:
-                    header_content = header_file.read().decode('utf-8', errors='ignore')
-                    rows, columns = extract_size_from_config(header_content)
-            except Exception as e:
-                print(f"Error reading header file for {band}: {e}")
-                continue
-                
-            # Read image data
-            img_files = [filename for filename in ima_prefixed if filename.endswith("mp#")]
-            if not img_files:
-                print(f"No mp# files found for {band}")
-                continue
-
-            if len(img_files) > 1:
-                print(f"Warning: Multiple mp# files found for {band}, using the first file: {img_files[0]}")
-            
-            img_name = img_files[0]
-            
-            try:
-                img_data = np.fromfile(os.path.join(band_folder, img_name), dtype=np.double)
-                #print(f"Band: {band}, Min: {np.min(img_data)}, Max: {np.max(img_data)}")
-                
-                img_data = np.reshape(img_data, (rows, columns))
-                
-                # Convert to 16-bit based on band type
-                if is_thermal or folder_type == "Tapp":
-                    # Scale temperature values appropriately
-                    img_data_16bit = (img_data * 100).astype(np.uint16)  # Different scaling for temperature
-                    #print(f"Using thermal scaling for {band}")
-                else:
-                    # Regular reflectance scaling
-                    img_data_16bit = (10000 * img_data).astype(np.uint16)
-                    #print(f"Using reflectance scaling for {band}")
-                    
-                bands_arr.append(img_data_16bit)
-            except Exception as e:
-                print(f"Error processing {band}: {e}")
-        
-        if not bands_arr:
-            print(f"No valid bands processed for {seq_dir}, skipping")
-            continue
-        
-        # Create GeoTIFF
-        imagename = os.path.join(savedirectory, f"{seq_dir}.tif")
-        
-        # Add georeferencing info
-        origin_x = 600000
-        origin_y = 3850000
-        pixel_size = 2.5  # 2.5 meter resolution
-        transform = from_origin(origin_x, origin_y, pixel_size, pixel_size)
-        
-        try:
-            with rasterio.open(
-                imagename, 'w',
-                driver='GTiff',
-                height=bands_arr[0].shape[0],
-                width=bands_arr[0].shape[1],
-                count=len(bands_arr),
-                dtype=str(bands_arr[0].dtype),
-                crs="EPSG:32632",
-                transform=transform
-            ) as dst:
-                for i, band_data in enumerate(bands_arr):
-                    dst.write(band_data, i + 1)
-                    dst.set_band_description(i + 1, band_names[i])
-            
-            print(f"Successfully created GeoTIFF for {seq_dir}.")
-        except Exception as e:
-            print(f"Error creating GeoTIFF for {seq_dir}: {e}")
+    # Sequences are independent, so they are processed in parallel threads (GDAL and NumPy release the GIL).
+    # Each pooled sequence compresses with one GDAL thread, so the pool alone sets the number of busy cores
+    seq_paths = [entry.path for entry in sequence_entries]
+    if len(seq_paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(seq_paths), os.cpu_count() or 1)) as executor:
+            list(executor.map(process_sequence, seq_paths,
+                              repeat(pathsavesim), repeat(thermal_bands), repeat(1)))
+    else:
+        for seq_path in seq_paths:
+            process_sequence(seq_path, pathsavesim, thermal_bands)
 
     print("Processing complete")
 
-if __name__ == "__main__":
+def main():
     save_tiff_and_props()
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,54 @@
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
-import json
+try:
+    # C-backed tree builder and serializer with the ElementTree API
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+import copy
 import os
+from config_loader import get_config
 from preprocess_soils import check_soil_factor_path, get_spectral_intervals
 
 def create_thermal_function(id_temperature, mean_t, delta_t):
-    thermal_func = ET.Element("ThermalFunction")
-    thermal_func.set("deltaT", str(delta_t))
-    thermal_func.set("idTemperature", id_temperature)
-    thermal_func.set("meanT", str(mean_t))
-    thermal_func.set("override3DMatrix", "0")
-    thermal_func.set("singleTemperatureSurface", "1")
-    thermal_func.set("useOpticalFactorMatrix", "0")
-    thermal_func.set("usePrecomputedIPARs", "0")
-    return thermal_func
+    # Attributes passed as one dict literal instead of one set() call each
+    return ET.Element("ThermalFunction", {
+        "deltaT": str(delta_t),
+        "idTemperature": id_temperature,
+        "meanT": str(mean_t),
+        "override3DMatrix": "0",
+        "singleTemperatureSurface": "1",
+        "useOpticalFactorMatrix": "0",
+        "usePrecomputedIPARs": "0"
+    })
 
-def create_lambertian_multi(ident, model_name, database_name, use_prospect=False, prospect_params=None):
-    lambertian_multi = ET.Element("LambertianMulti")
-    lambertian_multi.set("ident", ident)
-    lambertian_multi.set("lambertianDefinition", "0")
-    lambertian_multi.set("roStDev", "0.0")
-    lambertian_multi.set("useMultiplicativeFactorForLUT", "0")
-    
-    lambertian = ET.SubElement(lambertian_multi, "Lambertian")
-    lambertian.set("ModelName", model_name)
-    lambertian.set("databaseName", database_name)
-    lambertian.set("useSpecular", "0")
-    
-    prospect_module = ET.SubElement(lambertian, "ProspectExternalModule")
-    prospect_module.set("isFluorescent", "0")
-    prospect_module.set("useProspectExternalModule", "1" if use_prospect else "0")
-    
-    if use_prospect and prospect_params:
-        params = ET.SubElement(prospect_module, "ProspectExternParameters")
-        for key, value in prospect_params.items():
-            params.set(key, str(value))
+def create_prospect_parameters(prospect_params):
+    """Build a ProspectExternParameters element; leaves copy it with create_lambertian_multi(prospect_template=...)"""
+    return ET.Element("ProspectExternParameters", {key: str(value) for key, value in prospect_params.items()})
+
+def create_lambertian_multi(ident, model_name, database_name, use_prospect=False, prospect_params=None,
+                            prospect_template=None):
+    lambertian_multi = ET.Element("LambertianMulti", {
+        "ident": ident,
+        "lambertianDefinition": "0",
+        "roStDev": "0.0",
+        "useMultiplicativeFactorForLUT": "0"
+    })
+    
+    lambertian = ET.SubElement(lambertian_multi, "Lambertian", {
+        "ModelName": model_name,
+        "databaseName": database_name,
+        "useSpecular": "0"
+    })
+    
+    prospect_module = ET.SubElement(lambertian, "ProspectExternalModule", {
+        "isFluorescent": "0",
+        "useProspectExternalModule": "1" if use_prospect else "0"
+    })
+    
+    if use_prospect and prospect_template is not None:
+        # Copy the prebuilt subtree instead of converting and setting every parameter again
+        prospect_module.append(copy.deepcopy(prospect_template))
+    elif use_prospect and prospect_params:
+        prospect_module.append(create_prospect_parameters(prospect_params))
     
     return lambertian_multi
 
@@ -100,11 +114,15 @@ def create_soil_lambertian_multi(soil_name, soil_folder_path, spectral_info):
     node_factor.set("useSameFactorForAllBands", "1")
     node_factor.set("useSameOpticalFactorMatrixForAllBands", "0")
     
+    # Read the soil folder once instead of one exists() stat per band; only regular files can be band files
+    with os.scandir(soil_folder_path) as it:
+        soil_files = {entry.name for entry in it if entry.is_file()}
+    
     # Add lambertianMultiplicativeFactorForLUT elements for each band
     for band_num in sorted(spectral_info.keys()):
         band_file = f"sol_bande{band_num}.txt"
-        band_file_path = os.path.join(soil_folder_path, band_file)
-        if os.path.exists(band_file_path):
+        if band_file in soil_files:
+            band_file_path = os.path.join(soil_folder_path, band_file)
             node_factor.append(create_lambertian_multiplicative_factor_for_lut(band_file_path))
     
     return lambertian_multi
@@ -112,18 +130,16 @@ def create_soil_lambertian_multi(soil_name, soil_folder_path, spectral_info):
 def count_trees_in_position_file(position_file_path):
     try:
         with open(position_file_path, 'r') as f:
-            lines = f.readlines()
-            # Count lines that start with '0' (tree positions)
-            tree_count = sum(1 for line in lines if line.strip().startswith('0'))
+            # Count lines that start with '0' (tree positions), streaming line by line
+            tree_count = sum(1 for line in f if line.lstrip().startswith('0'))
         return tree_count
     except Exception as e:
         print(f"Error reading position file: {e}")
         return 0
 
 def update_coeff_diff_xml(config_path):
-    # Read configuration
-    with open(config_path, 'r') as f:
-        config = json.load(f)
+    # Read configuration (parsed once per process)
+    config = get_config(config_path)
     
     # Get paths and settings
     position_file = config['paths']['position_txt_path']
@@ -179,8 +195,8 @@ def update_coeff_diff_xml(config_path):
             if spectral_info:
                 soil_factor_path = config['paths']['soil_factor_path']
                 # Get all soil folders
-                soil_folders = [f for f in os.listdir(soil_factor_path) 
-                              if os.path.isdir(os.path.join(soil_factor_path, f))]
+                with os.scandir(soil_factor_path) as it:
+                    soil_folders = [entry.name for entry in it if entry.is_dir()]
                 
                 # Create LambertianMulti elements for each soil
                 for soil_folder in soil_folders:
@@ -214,15 +230,17 @@ def update_coeff_diff_xml(config_path):
 
     # Add leaf entries if chlorophyl or water_thickness is true
     if params_to_vary['chlorophyl'] or params_to_vary['water_thickness']:
-        for i in range(num_trees):
-            leaf = create_lambertian_multi(
+        prospect_template = create_prospect_parameters(prospect_params)
+        lambertian_multi_functions.extend(
+            create_lambertian_multi(
                 f"leaf_{i}",
                 "reflect_equal_1_trans_equal_0_0",
                 "Lambertian_vegetation.db",
                 True,
-                prospect_params
+                prospect_template=prospect_template
             )
-            lambertian_multi_functions.append(leaf)
+            for i in range(num_trees)
+        )
     else:
         # Add a single default leaf entry for uniform parameters
         leaf = create_lambertian_multi(
@@ -263,28 +281,31 @@ def update_coeff_diff_xml(config_path):
     # Add temperature functions based on tree_temperature setting
     if params_to_vary['tree_temperature']:
         # Add individual temperature entries for each tree
-        for i in range(num_trees):
-            temperatures.append(create_thermal_function(f"Temp_leaf_{i}", 300.0, 0))
-            temperatures.append(create_thermal_function(f"Temp_trunk_{i}", 300.0, 0))
+        temperatures.extend(
+            create_thermal_function(f"Temp_{part}_{i}", 300.0, 0)
+            for i in range(num_trees)
+            for part in ("leaf", "trunk")
+        )
     else:
         # Add a single temperature range for all trees
         temperatures.append(create_thermal_function("Temperature_290_310", 300.0, 10))
     
-    # Convert to string with pretty printing
-    xmlstr = minidom.parseString(ET.tostring(root)).toprettyxml(indent="    ")
-    
     # Write to file
     output_path = os.path.join(simulation_path, "input", "coeff_diff.xml")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-        # Remove the first line (xml declaration) since we already wrote it
-        f.write(xmlstr[xmlstr.find("\n")+1:])
+    # Indent in place (four spaces, like the DART files) and write straight to disk.
+    # lxml and ElementTree on Python 3.9+ have indent(); older stdlib fallbacks write the file unindented
+    if hasattr(ET, "indent"):
+        ET.indent(root, space="    ")
+    ET.ElementTree(root).write(output_path, xml_declaration=True, encoding="UTF-8")
     
     print(f"coeff_diff.xml has been Updated")
 
-if __name__ == "__main__":
+def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     config_path = os.path.join(script_dir, "config.json")
-    update_coeff_diff_xml(config_path) 
\ No newline at end of file
+    update_coeff_diff_xml(config_path)
+
+if __name__ == "__main__":
+    main() 
\ No newline at end of file
@@ -1,39 +1,110 @@
+import io
 import os
+import shutil
 import sys
-import json
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from functools import lru_cache
+from config_loader import get_config
 from preprocess_soils import check_soil_factor_path, get_spectral_intervals
 
+try:
+    # C-backed parser/serializer with the same tree API; ElementTree is the fallback
+    from lxml import etree as maket_etree
+except ImportError:
+    maket_etree = ET
+
+# Serialized XML is handed to the OS in few large writes instead of many 8 KiB ones
+WRITE_BUFFER_SIZE = 1 << 18
+
+# coeff_diff.xml elements read by scan_coeff_diff: tag -> (required parent tag, attribute collected)
+COEFF_DIFF_LOOKUPS = {
+    "LambertianMulti": ("LambertianMultiFunctions", "ident"),
+    "ThermalFunction": ("Temperatures", "idTemperature"),
+}
+COEFF_DIFF_TAGS = tuple(COEFF_DIFF_LOOKUPS)
+
+def compile_first_match(tag):
+    """Return a function giving the first descendant `tag` element of an element (like find(".//tag")), or None"""
+    if maket_etree is ET:
+        # iter() runs in the C accelerator, find() goes through the Python ElementPath evaluator
+        return lambda root: next((elem for elem in root.iter(tag) if elem is not root), None)
+    # Compiled once; the [1] predicate stops the search at the first match in document order
+    xpath = maket_etree.XPath(f"(.//{tag})[1]")
+    def find_first(root):
+        found = xpath(root)
+        return found[0] if found else None
+    return find_first
+
+find_optical_property_link = compile_first_match("OpticalPropertyLink")
+find_thermal_property_link = compile_first_match("ThermalPropertyLink")
+
 def load_config():
-    """Load configuration from config.json file"""
+    """Load configuration from config.json file (parsed once per process and shared, do not modify it)"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, "config.json")
-    with open(config_path, 'r') as f:
-        return json.load(f)
+    return get_config(os.path.join(script_dir, "config.json"))
+
+def scan_coeff_diff(coeff_diff_path):
+    """
+    Collect the LambertianMulti idents and ThermalFunction idTemperatures of coeff_diff.xml in one streaming pass.
+    The result is memoized per file version and shared between callers.
+    
+    Args:
+        coeff_diff_path (str): Path to coeff_diff.xml
+    
+    Returns:
+        tuple: (idents of LambertianMultiFunctions/LambertianMulti, idTemperatures of Temperatures/ThermalFunction)
+    """
+    st = os.stat(coeff_diff_path)
+    return _scan_coeff_diff(os.path.abspath(coeff_diff_path), st.st_mtime_ns, st.st_size)
+
+@lru_cache(maxsize=4)
+def _scan_coeff_diff(coeff_diff_path, mtime_ns, size):
+    # A rewritten coeff_diff.xml has a new mtime/size, so it misses the cache and is scanned again
+    wanted = COEFF_DIFF_LOOKUPS
+    found = {tag: [] for tag in wanted}
+    if maket_etree is not ET:
+        # lxml filters the tags in C; parsed elements are dropped so the tree never builds up
+        for _, elem in maket_etree.iterparse(coeff_diff_path, events=("end",), tag=COEFF_DIFF_TAGS):
+            parent_tag, attribute = wanted[elem.tag]
+            parent = elem.getparent()
+            if parent is not None and parent.tag == parent_tag:
+                found[elem.tag].append(elem.get(attribute))
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
+    else:
+        # ElementTree has no parent links, so track the open tags
+        open_tags = []
+        for event, elem in ET.iterparse(coeff_diff_path, events=("start", "end")):
+            if event == "start":
+                open_tags.append(elem.tag)
+                continue
+            open_tags.pop()
+            if elem.tag in wanted:
+                parent_tag, attribute = wanted[elem.tag]
+                if open_tags and open_tags[-1] == parent_tag:
+                    found[elem.tag].append(elem.get(attribute))
+                elem.clear()
+    return tuple(found["LambertianMulti"]), tuple(found["ThermalFunction"])
 
 def get_soil_names_from_coeff_diff(simulation_path):
     """Extract soil names from coeff_diff.xml based on LambertianMulti elements"""
     coeff_diff_path = os.path.join(simulation_path, "input", "coeff_diff.xml")
-    
-    if not os.path.exists(coeff_diff_path):
-        print(f"Error: coeff_diff.xml not found at {coeff_diff_path}")
-        return None
 
     try:
-        tree = ET.parse(coeff_diff_path)
-        root = tree.getroot()
-        
-        # Find all LambertianMulti elements
+        # Idents of all LambertianMulti elements
         soil_elements = []
-        lambertian_multi_list = root.findall(".//LambertianMultiFunctions/LambertianMulti")
+        lambertian_multi_idents, _ = scan_coeff_diff(coeff_diff_path)
         
-        for element in lambertian_multi_list:
-            ident = element.get("ident")
+        for ident in lambertian_multi_idents:
             if ident and ident.startswith("soil_"):
                 soil_elements.append(ident)
         
         return soil_elements
+    except FileNotFoundError:
+        # Reported by the stat in scan_coeff_diff, no separate exists() check
+        print(f"Error: coeff_diff.xml not found at {coeff_diff_path}")
+        return None
     except Exception as e:
         print(f"Error parsing coeff_diff.xml: {str(e)}")
         return None
@@ -41,35 +112,26 @@ def get_soil_names_from_coeff_diff(simulation_path):
 def get_thermal_functions_from_coeff_diff(simulation_path):
     """Extract thermal function IDs from coeff_diff.xml"""
     coeff_diff_path = os.path.join(simulation_path, "input", "coeff_diff.xml")
-    
-    if not os.path.exists(coeff_diff_path):
-        print(f"Error: coeff_diff.xml not found at {coeff_diff_path}")
-        return None
 
     try:
-        tree = ET.parse(coeff_diff_path)
-        root = tree.getroot()
-        
-        # Find all ThermalFunction elements
+        # idTemperatures of all ThermalFunction elements
         thermal_functions = []
-        thermal_function_list = root.findall(".//Temperatures/ThermalFunction")
+        _, thermal_function_ids = scan_coeff_diff(coeff_diff_path)
         
-        for element in thermal_function_list:
-            id_temp = element.get("idTemperature")
+        for id_temp in thermal_function_ids:
             if id_temp:
                 thermal_functions.append(id_temp)
         
         return thermal_functions
+    except FileNotFoundError:
+        print(f"Error: coeff_diff.xml not found at {coeff_diff_path}")
+        return None
     except Exception as e:
         print(f"Error parsing coeff_diff.xml for thermal functions: {str(e)}")
         return None
 
-def determine_soil_name(config_path, simulation_path):
+def determine_soil_name(config, simulation_path):
     """Determine soil name based on multi_sol setting and available soil folders"""
-    # Read configuration
-    with open(config_path, 'r') as f:
-        config = json.load(f)
-    
     # Check multi_sol setting
     multi_sol = config['simulation_settings']['multi_sol']
     
@@ -97,9 +159,8 @@ def determine_thermal_function(simulation_path, soil_name):
 
 def update_maket_xml(config_path):
     """Update maket.xml with appropriate soil name and thermal properties from coeff_diff.xml"""
-    # Read configuration
-    with open(config_path, 'r') as f:
-        config = json.load(f)
+    # Read configuration (parsed once per process)
+    config = get_config(config_path)
     
     # Get simulation path
     simulation_path = config['paths']['simulation_path']
@@ -107,54 +168,70 @@ def update_maket_xml(config_path):
     # Path to maket.xml
     maket_path = os.path.join(simulation_path, "input", "maket.xml")
     
-    if not os.path.exists(maket_path):
+    # Read maket.xml once; a missing file is reported by open, no separate exists() check
+    try:
+        with open(maket_path, 'rb') as f:
+            maket_data = f.read()
+    except FileNotFoundError:
         print(f"Error: maket.xml not found at {maket_path}")
         return False
     
     # Create backup of original file
     backup_path = maket_path + ".backup"
     if not os.path.exists(backup_path):
-        import shutil
         shutil.copy2(maket_path, backup_path)
         print(f"Created backup of maket.xml at {backup_path}")
     
     # Determine soil name to use
-    soil_name = determine_soil_name(config_path, simulation_path)
+    soil_name = determine_soil_name(config, simulation_path)
     
     # Determine thermal function to use
     thermal_function = determine_thermal_function(simulation_path, soil_name)
     
     try:
         # Parse XML
-        tree = ET.parse(maket_path)
+        tree = maket_etree.parse(io.BytesIO(maket_data))
         root = tree.getroot()
         
         # Update optical property
-        soil_link = root.find(".//OpticalPropertyLink")
+        soil_link = find_optical_property_link(root)
         if soil_link is None:
             print("Error: Could not find OpticalPropertyLink in maket.xml")
             return False
         
         current_soil = soil_link.get("ident")
+        changed = current_soil != soil_name
         print(f"Updating optical property in maket.xml from '{current_soil}' to '{soil_name}'")
         soil_link.set("ident", soil_name)
         
         # Update thermal property
-        thermal_link = root.find(".//ThermalPropertyLink")
+        thermal_link = find_thermal_property_link(root)
         if thermal_link is None:
             print("Error: Could not find ThermalPropertyLink in maket.xml")
         else:
             current_thermal = thermal_link.get("idTemperature")
+            changed = changed or current_thermal != thermal_function
             print(f"Updating thermal property in maket.xml from '{current_thermal}' to '{thermal_function}'")
             thermal_link.set("idTemperature", thermal_function)
         
-        # Write back to file with pretty formatting
-        xmlstr = minidom.parseString(ET.tostring(root)).toprettyxml(indent="    ")
+        if not changed:
+            # Re-runs with the same soil: the file on disk is already correct
+            print("maket.xml already up to date, not rewriting it")
+            return True
         
-        with open(maket_path, "w", encoding="utf-8") as f:
-            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            # Remove the first line (xml declaration) since we already wrote it
-            f.write(xmlstr[xmlstr.find("\n")+1:])
+        # Write the tree as parsed (original indentation kept) to a temp file, then swap it in atomically
+        tmp_path = maket_path + ".tmp"
+        try:
+            with open(tmp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+                tree.write(f, encoding="UTF-8", xml_declaration=True)
+            # Keep the permissions of the file being replaced
+            shutil.copymode(maket_path, tmp_path)
+            os.replace(tmp_path, maket_path)
+        except BaseException:
+            # Never leave a partial maket.xml.tmp behind in input/
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         
         print(f"Successfully updated maket.xml with:")
         print(f"  - Soil optical property: {soil_name}")
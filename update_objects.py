@@ -1,218 +1,161 @@
-import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom
-import json
 import os
 import random
+import shutil
+from itertools import repeat
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured, unstructured_to_structured
+from xml.sax.saxutils import escape
+from config_loader import get_config
+
+# Serialized XML is handed to the OS in few large writes instead of many 8 KiB ones
+WRITE_BUFFER_SIZE = 1 << 18
+
+# Columns of a position file line
+TRANSFORM_FIELDS = ('xpos', 'ypos', 'zpos', 'xscale', 'yscale', 'zscale', 'xrot', 'yrot', 'zrot')
+POSITION_DTYPE = np.dtype([('index', np.int32)] + [(field, np.float64) for field in TRANSFORM_FIELDS])
+NUM_POSITION_FIELDS = len(POSITION_DTYPE)
+
+# Characters ElementTree escapes in attribute values besides &, < and >
+ATTRIBUTE_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"}
+
+# object_3d.xml is almost entirely static, so it is rendered from text templates rather than built as a tree;
+# the layout is what ET.indent(space="    ") gives for the same elements
+OBJECT_3D_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<DartFile build="v1410" version="5.10.6">
+    <object_3d generateTriangleFileXML="0">
+        <Types>
+            <DefaultTypes>
+                <DefaultType indexOT="101" name="Default_Object" typeColor="255 0 0"/>
+                <DefaultType indexOT="102" name="Leaf" typeColor="0 175 0"/>
+                <DefaultType indexOT="103" name="Trunk" typeColor="71 55 25"/>
+            </DefaultTypes>
+            <CustomTypes/>
+        </Types>
+        <ObjectList>
+"""
+
+OBJECT_TEMPLATE = """\
+            <Object file_src="{file_src}" hasGroups="1" hidden="0" hideRB="0" isDisplayed="1" name="Object" num="{num}" objectColor="125 0 125" objectDEMMode="0" repeatedOnBorder="1">
+                <GeometricProperties>
+                    <PositionProperties xpos="{xpos}" ypos="{ypos}" zpos="{zpos}"/>
+                    <Dimension3D xdim="9.32332992553711" ydim="9.625602722167969" zdim="6.392255189130083"/>
+                    <Center3D xCenter="-0.15236902236938477" yCenter="-0.17827844619750977" zCenter="3.1936185945523903"/>
+                    <ScaleProperties xScaleDeviation="0.0" xscale="{xscale}" yScaleDeviation="0.0" yscale="{yscale}" zScaleDeviation="0.0" zscale="{zscale}"/>
+                    <RotationProperties xRotDeviation="0.0" xrot="{xrot}" yRotDeviation="0.0" yrot="{yrot}" zRotDeviation="0.0" zrot="{zrot}"/>
+                </GeometricProperties>
+                <ObjectOpticalProperties isLAICalc="0" isSingleGlobalLai="0" sameExitanceObject="0" sameOPObject="0" transparent="0"/>
+                <ObjectTypeProperties sameOTObject="0"/>
+                <Groups>
+                    <Group groupDEMMode="0" hidden="0" hideRB="0" isLAICalc="0" name="Leaves" num="1" transparent="0">
+                        <GroupOpticalProperties>
+                            <SurfaceOpticalProperties doubleFace="0">
+                                <OpticalPropertyLink ident="{leaf_ident}" indexFctPhase="0" type="0"/>
+                            </SurfaceOpticalProperties>
+                            <SurfaceExitanceProperties doubleFace="0" useTemperaturePerTriangle="0">
+                                <ThermalPropertyLink idTemperature="{leaf_temperature}" indexTemperature="0"/>
+                            </SurfaceExitanceProperties>
+                        </GroupOpticalProperties>
+                        <GroupTypeProperties>
+                            <ObjectTypeLink identOType="Leaf" indexOT="102"/>
+                        </GroupTypeProperties>
+                    </Group>
+                    <Group groupDEMMode="0" hidden="0" hideRB="0" isLAICalc="0" name="Trunk" num="2" transparent="0">
+                        <GroupOpticalProperties>
+                            <SurfaceOpticalProperties doubleFace="0">
+                                <OpticalPropertyLink ident="trunk" indexFctPhase="1" type="0"/>
+                            </SurfaceOpticalProperties>
+                            <SurfaceExitanceProperties doubleFace="0" useTemperaturePerTriangle="0">
+                                <ThermalPropertyLink idTemperature="{trunk_temperature}" indexTemperature="0"/>
+                            </SurfaceExitanceProperties>
+                        </GroupOpticalProperties>
+                        <GroupTypeProperties>
+                            <ObjectTypeLink identOType="Trunk" indexOT="103"/>
+                        </GroupTypeProperties>
+                    </Group>
+                </Groups>
+            </Object>
+"""
+
+OBJECT_3D_FOOTER = """\
+        </ObjectList>
+        <ObjectFields/>
+    </object_3d>
+</DartFile>
+"""
 
 def read_positions_file(filename):
-    positions = []
+    """Return the index, position, scale and rotation of every object line as a POSITION_DTYPE record array"""
+    rows = []
     with open(filename, 'r') as f:
         for line in f:
             # Skip comments and empty lines
             if line.startswith('//') or line.strip() == '' or line.strip() == 'complete transformation':
                 continue
             # Parse the line into values
-            values = line.strip().split()
-            if len(values) == 10:  # Ensure we have all 10 values
-                positions.append({
-                    'index': int(values[0]),
-                    'xpos': float(values[1]),
-                    'ypos': float(values[2]),
-                    'zpos': float(values[3]),
-                    'xscale': float(values[4]),
-                    'yscale': float(values[5]),
-                    'zscale': float(values[6]),
-                    'xrot': float(values[7]),
-                    'yrot': float(values[8]),
-                    'zrot': float(values[9])
-                })
-    return positions
+            values = line.split()
+            if len(values) == NUM_POSITION_FIELDS:  # Ensure we have all 10 values
+                rows.append(values)
+    # All strings are converted in one call
+    values = np.array(rows, dtype=np.float64)
+    # One contiguous record per object
+    values = values.reshape(-1, NUM_POSITION_FIELDS)
+    return unstructured_to_structured(values, dtype=POSITION_DTYPE)
 
 def get_obj_files(tree_obj_path):
     """Get all .obj files from the tree_obj_path"""
     obj_files = []
-    for root, _, files in os.walk(tree_obj_path):
-        for file in files:
-            if file.endswith('.obj'):
-                obj_files.append(os.path.join(root, file))
+    # Same order as os.walk (a folder's files, then its subfolders), but file types come from the DirEntry
+    pending = [tree_obj_path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                entries = list(it)
+        except OSError:
+            # Unreadable folders are skipped, as os.walk does
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+            elif entry.name.endswith('.obj'):
+                obj_files.append(entry.path)
+        pending.extend(reversed(subdirs))
     return obj_files
 
-def create_base_xml():
-    # Create the root structure
-    root = ET.Element("DartFile")
-    root.set("build", "v1410")
-    root.set("version", "5.10.6")
-    
-    # Create object_3d element
-    object_3d = ET.SubElement(root, "object_3d")
-    object_3d.set("generateTriangleFileXML", "0")
-    
-    # Create Types section
-    types = ET.SubElement(object_3d, "Types")
-    default_types = ET.SubElement(types, "DefaultTypes")
-    
-    # Add default types
-    default_type_data = [
-        ("101", "Default_Object", "255 0 0"),
-        ("102", "Leaf", "0 175 0"),
-        ("103", "Trunk", "71 55 25")
-    ]
-    
-    for index, name, color in default_type_data:
-        default_type = ET.SubElement(default_types, "DefaultType")
-        default_type.set("indexOT", index)
-        default_type.set("name", name)
-        default_type.set("typeColor", color)
-    
-    ET.SubElement(types, "CustomTypes")
-    
-    # Create ObjectList
-    object_list = ET.SubElement(object_3d, "ObjectList")
-    
-    return root, object_list
+def escape_attribute(value):
+    """Escape a string for use inside a double-quoted XML attribute"""
+    return escape(value, ATTRIBUTE_ENTITIES)
 
 def create_object(position_data, object_index, obj_file_path, use_individual_temps, use_individual_optical):
-    obj = ET.Element("Object")
-    obj.set("file_src", obj_file_path)
-    obj.set("hasGroups", "1")
-    obj.set("hidden", "0")
-    obj.set("hideRB", "0")
-    obj.set("isDisplayed", "1")
-    obj.set("name", "Object")
-    obj.set("num", str(object_index))
-    obj.set("objectColor", "125 0 125")
-    obj.set("objectDEMMode", "0")
-    obj.set("repeatedOnBorder", "1")
-    
-    # Geometric Properties
-    geo_props = ET.SubElement(obj, "GeometricProperties")
-    
-    pos_props = ET.SubElement(geo_props, "PositionProperties")
-    pos_props.set("xpos", str(position_data['xpos']))
-    pos_props.set("ypos", str(position_data['ypos']))
-    pos_props.set("zpos", str(position_data['zpos']))
-    
-    dim_3d = ET.SubElement(geo_props, "Dimension3D")
-    dim_3d.set("xdim", "9.32332992553711")
-    dim_3d.set("ydim", "9.625602722167969")
-    dim_3d.set("zdim", "6.392255189130083")
-    
-    center_3d = ET.SubElement(geo_props, "Center3D")
-    center_3d.set("xCenter", "-0.15236902236938477")
-    center_3d.set("yCenter", "-0.17827844619750977")
-    center_3d.set("zCenter", "3.1936185945523903")
-    
-    scale_props = ET.SubElement(geo_props, "ScaleProperties")
-    scale_props.set("xScaleDeviation", "0.0")
-    scale_props.set("xscale", str(position_data['xscale']))
-    scale_props.set("yScaleDeviation", "0.0")
-    scale_props.set("yscale", str(position_data['yscale']))
-    scale_props.set("zScaleDeviation", "0.0")
-    scale_props.set("zscale", str(position_data['zscale']))
-    
-    rot_props = ET.SubElement(geo_props, "RotationProperties")
-    rot_props.set("xRotDeviation", "0.0")
-    rot_props.set("xrot", str(position_data['xrot']))
-    rot_props.set("yRotDeviation", "0.0")
-    rot_props.set("yrot", str(position_data['yrot']))
-    rot_props.set("zRotDeviation", "0.0")
-    rot_props.set("zrot", str(position_data['zrot']))
-    
-    # Add other properties
-    obj_optical = ET.SubElement(obj, "ObjectOpticalProperties")
-    obj_optical.set("isLAICalc", "0")
-    obj_optical.set("isSingleGlobalLai", "0")
-    obj_optical.set("sameExitanceObject", "0")
-    obj_optical.set("sameOPObject", "0")
-    obj_optical.set("transparent", "0")
-    
-    obj_type = ET.SubElement(obj, "ObjectTypeProperties")
-    obj_type.set("sameOTObject", "0")
-    
-    # Add Groups
-    groups = ET.SubElement(obj, "Groups")
-    
-    # Leaves Group
-    leaves = ET.SubElement(groups, "Group")
-    leaves.set("groupDEMMode", "0")
-    leaves.set("hidden", "0")
-    leaves.set("hideRB", "0")
-    leaves.set("isLAICalc", "0")
-    leaves.set("name", "Leaves")
-    leaves.set("num", "1")
-    leaves.set("transparent", "0")
-    
-    leaves_op = ET.SubElement(leaves, "GroupOpticalProperties")
-    leaves_sop = ET.SubElement(leaves_op, "SurfaceOpticalProperties")
-    leaves_sop.set("doubleFace", "0")
-    
-    leaves_opl = ET.SubElement(leaves_sop, "OpticalPropertyLink")
-    # Set optical property based on configuration
-    if use_individual_optical:
-        leaves_opl.set("ident", f"leaf_{object_index}")
-    else:
-        leaves_opl.set("ident", "leaf")
-    leaves_opl.set("indexFctPhase", "0")
-    leaves_opl.set("type", "0")
-    
-    leaves_sep = ET.SubElement(leaves_op, "SurfaceExitanceProperties")
-    leaves_sep.set("doubleFace", "0")
-    leaves_sep.set("useTemperaturePerTriangle", "0")
-    
-    leaves_tpl = ET.SubElement(leaves_sep, "ThermalPropertyLink")
-    # Set temperature property based on configuration
-    if use_individual_temps:
-        leaves_tpl.set("idTemperature", f"Temp_leaf_{object_index}")
-    else:
-        leaves_tpl.set("idTemperature", "Temperature_290_310")
-    leaves_tpl.set("indexTemperature", "0")
-    
-    leaves_gtp = ET.SubElement(leaves, "GroupTypeProperties")
-    leaves_otl = ET.SubElement(leaves_gtp, "ObjectTypeLink")
-    leaves_otl.set("identOType", "Leaf")
-    leaves_otl.set("indexOT", "102")
-    
-    # Trunk Group
-    trunk = ET.SubElement(groups, "Group")
-    trunk.set("groupDEMMode", "0")
-    trunk.set("hidden", "0")
-    trunk.set("hideRB", "0")
-    trunk.set("isLAICalc", "0")
-    trunk.set("name", "Trunk")
-    trunk.set("num", "2")
-    trunk.set("transparent", "0")
-    
-    trunk_op = ET.SubElement(trunk, "GroupOpticalProperties")
-    trunk_sop = ET.SubElement(trunk_op, "SurfaceOpticalProperties")
-    trunk_sop.set("doubleFace", "0")
-    
-    trunk_opl = ET.SubElement(trunk_sop, "OpticalPropertyLink")
-    trunk_opl.set("ident", "trunk")
-    trunk_opl.set("indexFctPhase", "1")
-    trunk_opl.set("type", "0")
-    
-    trunk_sep = ET.SubElement(trunk_op, "SurfaceExitanceProperties")
-    trunk_sep.set("doubleFace", "0")
-    trunk_sep.set("useTemperaturePerTriangle", "0")
-    
-    trunk_tpl = ET.SubElement(trunk_sep, "ThermalPropertyLink")
-    if use_individual_temps:
-        trunk_tpl.set("idTemperature", f"Temp_trunk_{object_index}")
-    else:
-        trunk_tpl.set("idTemperature", "Temperature_290_310")
-    trunk_tpl.set("indexTemperature", "0")
-    
-    trunk_gtp = ET.SubElement(trunk, "GroupTypeProperties")
-    trunk_otl = ET.SubElement(trunk_gtp, "ObjectTypeLink")
-    trunk_otl.set("identOType", "Trunk")
-    trunk_otl.set("indexOT", "103")
-    
-    return obj
+    """
+    Render one ObjectList/Object entry of object_3d.xml as indented text.
+    
+    Args:
+        position_data: The formatted TRANSFORM_FIELDS values (xpos, ypos, zpos, xscale, ..., zrot)
+    """
+    xpos, ypos, zpos, xscale, yscale, zscale, xrot, yrot, zrot = position_data
+    return OBJECT_TEMPLATE.format(
+        file_src=escape_attribute(obj_file_path),
+        num=object_index,
+        xpos=xpos,
+        ypos=ypos,
+        zpos=zpos,
+        xscale=xscale,
+        yscale=yscale,
+        zscale=zscale,
+        xrot=xrot,
+        yrot=yrot,
+        zrot=zrot,
+        # Set optical and temperature properties based on configuration
+        leaf_ident=f"leaf_{object_index}" if use_individual_optical else "leaf",
+        leaf_temperature=f"Temp_leaf_{object_index}" if use_individual_temps else "Temperature_290_310",
+        trunk_temperature=f"Temp_trunk_{object_index}" if use_individual_temps else "Temperature_290_310"
+    )
 
 def update_object_3d_xml(config_path):
-    # Read configuration
-    with open(config_path, 'r') as f:
-        config = json.load(f)
+    # Read configuration (parsed once per process)
+    config = get_config(config_path)
     
     # Get paths and settings
     position_file = config['paths']['position_txt_path']
@@ -223,7 +166,7 @@ def update_object_3d_xml(config_path):
     
     # Read positions
     positions = read_positions_file(position_file)
-    if not positions:
+    if not len(positions):
         print("No tree positions found!")
         return
     
@@ -237,38 +180,55 @@ def update_object_3d_xml(config_path):
     if not settings['multi_tree']:
         obj_files = [obj_files[0]]  # Use only the first obj file
     
-    # Create base XML structure
-    root, object_list = create_base_xml()
+    # Settings are the same for every object, so look them up once
+    multi_tree = settings['multi_tree']
+    first_obj_file = obj_files[0]
+    use_individual_temps = params_to_vary['tree_temperature']
+    use_individual_optical = params_to_vary['chlorophyl'] or params_to_vary['water_thickness']
     
-    # Add objects for each position
-    for i, pos in enumerate(positions):
-        # Select random obj file if multi_tree is true, otherwise use the single file
-        obj_file = random.choice(obj_files) if settings['multi_tree'] else obj_files[0]
-        
-        # Create object with appropriate settings
-        use_individual_temps = params_to_vary['tree_temperature']
-        use_individual_optical = params_to_vary['chlorophyl'] or params_to_vary['water_thickness']
-        
-        object_list.append(create_object(pos, i, obj_file, use_individual_temps, use_individual_optical))
+    # Format every position, scale and rotation value at once (same text as str(float))
+    position_strings = structured_to_unstructured(positions[list(TRANSFORM_FIELDS)]).astype(str).tolist()
     
-    # Add ObjectFields
-    ET.SubElement(root.find('object_3d'), "ObjectFields")
-    
-    # Create the XML string with proper formatting
-    xml_str = minidom.parseString(ET.tostring(root)).toprettyxml(indent="    ")
+    # Select random obj files (one call for all positions) if multi_tree is true, otherwise use the single file
+    if multi_tree:
+        chosen_obj_files = random.choices(obj_files, k=len(position_strings))
+    else:
+        chosen_obj_files = [first_obj_file] * len(position_strings)
     
-    # Remove any empty lines and write to file
+    # Write to file
     output_path = os.path.join(simulation_path, "input", "object_3d.xml")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-        # Remove the first line (xml declaration) since we already wrote it
-        f.write(xml_str[xml_str.find("\n")+1:])
+    # Stream each position's rendered Object entry into a temp file, then swap it in atomically;
+    # only the write buffer is held in memory, however many trees there are
+    num_objects = len(position_strings)
+    # Create objects with appropriate settings
+    object_args = (position_strings, range(num_objects), chosen_obj_files,
+                   repeat(use_individual_temps), repeat(use_individual_optical))
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            write = f.write
+            write(OBJECT_3D_HEADER.encode("utf-8"))
+            for object_xml in map(create_object, *object_args):
+                write(object_xml.encode("utf-8"))
+            write(OBJECT_3D_FOOTER.encode("utf-8"))
+        # Keep the permissions of the file being replaced; a first run has none to keep
+        if os.path.exists(output_path):
+            shutil.copymode(output_path, tmp_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        # Never leave a partial object_3d.xml.tmp behind in input/
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
     
     print(f"object_3d.xml has been Updated")
 
-if __name__ == "__main__":
+def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     config_path = os.path.join(script_dir, "config.json")
-    update_object_3d_xml(config_path) 
\ No newline at end of file
+    update_object_3d_xml(config_path)
+
+if __name__ == "__main__":
+    main() 
\ No newline at end of file